@@ -15,10 +15,14 @@ fileConfig(config.config_file_name)
 # モデルと Base を import（以下を追加）
 import sys
 import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
 
-from backend.db import Base  # Base をインポート
-from backend.models import user_model, schedule_model  # モデルをすべてインポート（必須）
+# アプリと同じモジュール名（db / models）で import し、同じ Base にモデルを登録させる
+from db import Base, DATABASE_URL  # Base をインポート
+from models import user_model, schedule_model, data_version_model, schedule_change_model, refresh_token_model, rate_limit_model  # モデルをすべてインポート（必須）
+
+# 接続先はアプリと同じ設定（.env / 環境変数）から組み立てる
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -69,6 +73,17 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # 呼び出し側（init_db.py・テスト）が接続を渡した場合はその接続で実行する
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
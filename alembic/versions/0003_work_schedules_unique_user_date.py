@@ -0,0 +1,43 @@
+"""add unique (user_id, work_date) constraint to work_schedules
+
+既存の重複行は id が最大の行（最後に保存された行）を残して削除します
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        DELETE FROM work_schedules a
+        USING work_schedules b
+        WHERE a.user_id = b.user_id
+          AND a.work_date = b.work_date
+          AND a.id < b.id
+        """
+    )
+    op.create_unique_constraint(
+        'uq_work_schedules_user_id_work_date',
+        'work_schedules',
+        ['user_id', 'work_date'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_work_schedules_user_id_work_date', 'work_schedules', type_='unique')
@@ -0,0 +1,49 @@
+# api/calendar.py
+
+import logging
+
+from fastapi import APIRouter, HTTPException, Path, Request, Response
+
+from core.http_cache import is_not_modified
+from services import calendar_service
+from utils.date_utils import month_range_of
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get(
+    "/calendar/{year}",
+    summary="祝日・営業日カレンダーの取得",
+    description=(
+        "指定された年の祝日一覧と、月ごとの営業日数（土日・祝日を除く）を返します\n"
+        "祝日データはサーバに同梱されたバージョン付きのデータを使用します（データに含まれない年は 404）"
+    ),
+    response_description="祝日（日付 → 名称）と月別営業日数を返します"
+)
+def get_calendar(request: Request, response: Response, year: int = Path(..., ge=1900, le=2999)):
+    if year not in calendar_service.get_supported_years():
+        logger.warning(f"Calendar requested for unsupported year: {year}")
+        raise HTTPException(status_code=404, detail=f"Holiday data is not available for {year}")
+
+    version = calendar_service.get_calendar_version()
+    etag = f'"calendar-{year}-{version}"'
+    # 祝日データはリリース時にしか変わらないため、長期間キャッシュさせる
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    holidays = calendar_service.get_holidays(year)
+    business_days = {}
+    for month in range(1, 13):
+        first_day, next_first_day = month_range_of(year, month)
+        business_days[month] = calendar_service.count_business_days(first_day, next_first_day)
+
+    response.headers.update(headers)
+    logger.debug(f"Calendar for {year}: {len(holidays)} holidays (version={version})")
+    return {
+        "year": year,
+        "version": version,
+        "holidays": {day.isoformat(): name for day, name in sorted(holidays.items())},
+        "business_days": business_days,
+    }
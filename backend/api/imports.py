@@ -0,0 +1,65 @@
+# api/imports.py
+
+import io
+import logging
+
+from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, UploadFile
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from core.password_utils import PasswordHasherBusy
+from core.security import get_current_user, verify_csrf_token
+from db import get_db
+from schemas.import_schema import ImportReportResponse
+from services.import_service import IMPORTERS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    dependencies=[Depends(get_current_user)]
+)
+
+@router.post(
+    "/imports/{kind}",
+    dependencies=[Depends(verify_csrf_token)],
+    summary="CSV の一括取り込み",
+    description=(
+        "スケジュール（`kind=schedules`、列: employee_number, work_date, location）または"
+        "ユーザ（`kind=users`、列: employee_number, name, email, commuting_allowance）の CSV を一括で取り込みます\n"
+        "1行でもエラーがある場合は何も反映せず、行ごとのエラーを返します\n"
+        "`dry_run=true` を指定すると、検証と登録・更新件数の集計だけを行います"
+        ),
+    response_description="取り込み結果（件数と行ごとのエラー）を返します",
+    response_model=ImportReportResponse
+)
+def import_csv(
+    kind: str = Path(..., pattern="^(schedules|users)$"),
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    # アップロードされたファイルを1行ずつ読む（BOM 付きの UTF-8 にも対応）
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = IMPORTERS[kind](db, stream, dry_run=dry_run)
+        return report.to_dict()
+
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=422, detail="CSV must be encoded in UTF-8")
+
+    except PasswordHasherBusy:
+        db.rollback()
+        logger.warning("Import rejected: password hasher is saturated")
+        raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": "1"})
+
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in import_csv: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in import_csv")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+    finally:
+        stream.detach()
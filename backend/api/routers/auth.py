@@ -1,21 +1,24 @@
 import logging
 import secrets
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 #from pydantic import BaseModel
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 
 from config import settings
-from core.password_utils import pwd_context
-from core.security import create_access_token, create_refresh_token, get_current_user
+from core.password_utils import PasswordHasherBusy, password_hasher
+from core.security import Principal, create_access_token, get_current_user
 from crud import user as crud_user
 from db import get_db
-from models.user_model import User
-from schemas.auth_schema import LoginResponse, PasswordChangeRequest 
+from schemas.auth_schema import LoginResponse, PasswordChangeRequest, RefreshResponse
 from schemas.common_schema import MessageResponse 
+from services.auth_service import authenticate_user
+from services.token_service import InvalidRefreshToken, issue_refresh_token, revoke_refresh_token, rotate_refresh_token
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,41 @@ router = APIRouter()
 #    old_password: str
 #    new_password: str
 
+def set_refresh_cookie(response: Response, refresh_token: str):
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        httponly=True,
+        secure=settings.env == "production",
+        samesite="Lax",
+        max_age=60 * settings.refresh_token_expire_minutes  # 7日
+    )
+
+def set_auth_cookies(response: Response, access_token: str, refresh_token: Optional[str], csrf_token: str):
+    secure_cookie = settings.env == "production"
+
+    response.set_cookie(
+        key="access_token",
+        value=access_token,
+        httponly=True,
+        secure=secure_cookie,
+        samesite="Lax",
+        max_age=60 * settings.access_token_expire_minutes  # 15分
+    )
+
+    if refresh_token is not None:
+        set_refresh_cookie(response, refresh_token)
+
+    # CSRFトークンは JavaScript から読めるように HttpOnly=False で保存
+    response.set_cookie(
+        key="csrf_token",
+        value=csrf_token,
+        httponly=False,  # JavaScriptからアクセス可能
+        secure=secure_cookie,
+        samesite="Lax",
+        max_age=60 * settings.access_token_expire_minutes
+    )
+
 # ログインエンドポイント
 @router.post(
     "/login",
@@ -34,20 +72,19 @@ router = APIRouter()
     response_description="ログイン成功時にトークンとステータスを返します",
     response_model=LoginResponse
 )
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     try:
-        user = crud_user.get_user_by_email(db, form_data.username)
-        if not user or not crud_user.verify_password(form_data.password, user.hashed_password):
+        user = await authenticate_user(db, form_data.username, form_data.password)
+        if not user:
             logger.warning(f"Failed login attempt for email: {form_data.username}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
         access_token = create_access_token(user.id)
-        refresh_token = create_refresh_token(user.id)
+        refresh_token = await issue_refresh_token(db, user.id)
         csrf_token = secrets.token_hex(32) # CSRFトークンを生成
-        secure_cookie = settings.env == "production"
 
         # フロントが読み取れるように JSON に含めて返す
         response = JSONResponse(content={
@@ -55,38 +92,18 @@ def login(
             "csrf_token": csrf_token,
             "is_default_password": user.is_default_password
         })
-
-        response.set_cookie(
-            key="access_token",
-            value=access_token,
-            httponly=True,
-            secure=secure_cookie,
-            samesite="Lax",
-            max_age=60 * 15  # 15分
-        )
-
-        response.set_cookie(
-            key="refresh_token",
-            value=refresh_token,
-            httponly=True,
-            secure=secure_cookie,
-            samesite="Lax",
-            max_age=60 * 60 * 24 * 7  # 7日
-        )
-
-        # CSRFトークンは JavaScript から読めるように HttpOnly=False で保存
-        response.set_cookie(
-            key="csrf_token",
-            value=csrf_token,
-            httponly=False,  # JavaScriptからアクセス可能
-            secure=secure_cookie,
-            samesite="Lax",
-            max_age=60 * 15
-        )
+        set_auth_cookies(response, access_token, refresh_token, csrf_token)
 
         logger.info(f"User login successful: id={user.id}, email={user.email}")
         return response
 
+    except HTTPException:
+        raise
+
+    except PasswordHasherBusy:
+        logger.warning("Login rejected: password hasher is saturated")
+        raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": "1"})
+
     except SQLAlchemyError as e:
         logger.error(f"Database error during login: {e}")
         raise HTTPException(status_code=500, detail="Database error")
@@ -95,17 +112,59 @@ def login(
         logger.error(f"Unexpected error during login: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post(
+    "/refresh",
+    summary="トークンの更新",
+    description=(
+        "リフレッシュトークン（Cookie）を検証し、アクセストークン・リフレッシュトークン・CSRFトークンを再発行します\n"
+        "リフレッシュトークンは1回限り有効で、使用済みのトークンが再び使われた場合はそのログインを無効にします"
+    ),
+    response_description="更新成功時に新しい CSRF トークンを返します",
+    response_model=RefreshResponse
+)
+async def refresh(request: Request, db: Session = Depends(get_db)):
+    try:
+        # パスワード（bcrypt）は検証しない。DB は条件付き UPDATE の1回だけ
+        user_id, refresh_token = await rotate_refresh_token(db, request.cookies.get("refresh_token"))
+
+        access_token = create_access_token(user_id)
+        csrf_token = secrets.token_hex(32)
+        response = JSONResponse(content={"message": "Token refreshed", "csrf_token": csrf_token})
+        set_auth_cookies(response, access_token, refresh_token, csrf_token)
+
+        logger.info(f"Token refreshed: user_id={user_id} (rotated={refresh_token is not None})")
+        return response
+
+    except InvalidRefreshToken:
+        logger.warning("Token refresh rejected: invalid refresh token")
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    except SQLAlchemyError as e:
+        logger.error(f"Database error during token refresh: {e}")
+        raise HTTPException(status_code=500, detail="Database error")
+
+    except Exception as e:
+        logger.error(f"Unexpected error during token refresh: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # ログアウトエンドポイント
 @router.post(
     "/logout",
     summary="ログアウト",
-    description="アクセストークンおよびリフレッシュトークンのクッキーを削除してログアウトします",
+    description="リフレッシュトークンを無効にし、アクセストークンおよびリフレッシュトークンのクッキーを削除してログアウトします",
     response_description="ログアウト成功のメッセージを返します"
 )
-def logout():
+async def logout(request: Request, db: Session = Depends(get_db)):
+    try:
+        await revoke_refresh_token(db, request.cookies.get("refresh_token"))
+    except SQLAlchemyError as e:
+        # Cookie の削除は続ける（トークンは期限切れまで有効なまま）
+        logger.error(f"Database error during logout: {e}")
+
     response = JSONResponse(content={"message": "Logged out"})
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
+    response.delete_cookie("csrf_token")
 
     logger.info("User logged out")
     return response
@@ -113,23 +172,41 @@ def logout():
 @router.post(
     "/change-password",
     summary="パスワード変更",
-    description="現在のパスワードを検証し、新しいパスワードに更新します",
+    description="現在のパスワードを検証し、新しいパスワードに更新します（他の端末のログインはリフレッシュできなくなります）",
     response_description="パスワード更新結果のメッセージを返します",
     response_model=MessageResponse
 )
-def change_password(
+async def change_password(
     request: PasswordChangeRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
-        if not crud_user.verify_password(request.old_password, current_user.hashed_password):
+        # current_user はキャッシュされたスナップショットのため、更新対象は DB から取得する
+        user = await run_in_threadpool(crud_user.get_user_by_id, db, current_user.id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        valid, _ = await password_hasher.verify_and_update(request.old_password, user.hashed_password)
+        if not valid:
             logger.warning(f"Password change failed (incorrect old password): user_id={current_user.id}")
             raise HTTPException(status_code=400, detail="Old password is incorrect")
 
-        crud_user.update_user_password(db, current_user, request.new_password)
+        new_hash = await password_hasher.hash(request.new_password)
+        # 既存のリフレッシュトークン（このセッションを含む）はすべて無効になるため、このセッション分だけ発行し直す
+        await run_in_threadpool(crud_user.update_user_password, db, user, new_hash)
+        refresh_token = await issue_refresh_token(db, user.id)
         logger.info(f"Password changed successfully: user_id={current_user.id}")
-        return JSONResponse(content={"message": "Password updated successfully"})
+        response = JSONResponse(content={"message": "Password updated successfully"})
+        set_refresh_cookie(response, refresh_token)
+        return response
+
+    except HTTPException:
+        raise
+
+    except PasswordHasherBusy:
+        logger.warning("Password change rejected: password hasher is saturated")
+        raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": "1"})
 
     except SQLAlchemyError as e:
         logger.error(f"Database error during password change: {e}")
@@ -137,4 +214,4 @@ def change_password(
 
     except Exception as e:
         logger.error(f"Unexpected error during password change: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
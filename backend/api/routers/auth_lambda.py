@@ -9,11 +9,12 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from config import settings
-from core.security import create_access_token, create_refresh_token
-from crud import user as crud_user
+from core.password_utils import PasswordHasherBusy
+from core.security import MISSING_SCHEDULE_SCOPE, create_access_token, create_service_token
 from db import get_db
-from models.user_model import User
-from schemas.token_schema import LambdaLoginResponse
+from schemas.token_schema import LambdaLoginResponse, ServiceTokenResponse
+from services.auth_service import authenticate_user
+from services.token_service import issue_refresh_token
 
 logger = logging.getLogger(__name__)
 
@@ -34,18 +35,18 @@ def verify_lambda_api_key(x_api_key: str = Header(...)):
     summary="Lambda専用ログインAPI",
     description="Lambdaからの呼び出し専用。アクセストークン、リフレッシュトークン、CSRFトークンをJSONで返します。",
 )
-def login_for_lambda(
+async def login_for_lambda(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     try:
-        user = crud_user.get_user_by_email(db, form_data.username)
-        if not user or not crud_user.verify_password(form_data.password, user.hashed_password):
+        user = await authenticate_user(db, form_data.username, form_data.password)
+        if not user:
             logger.warning(f"Failed lambda login attempt for email: {form_data.username}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
         access_token = create_access_token(user.id)
-        refresh_token = create_refresh_token(user.id)
+        refresh_token = await issue_refresh_token(db, user.id)
         csrf_token = secrets.token_hex(32)
 
         logger.info(f"Lambda login successful: id={user.id}, email={user.email}")
@@ -58,6 +59,13 @@ def login_for_lambda(
             message="Login successful"
         )
 
+    except HTTPException:
+        raise
+
+    except PasswordHasherBusy:
+        logger.warning("Lambda login rejected: password hasher is saturated")
+        raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": "1"})
+
     except SQLAlchemyError as e:
         logger.error(f"Database error during lambda login: {e}")
         raise HTTPException(status_code=500, detail="Database error")
@@ -65,3 +73,23 @@ def login_for_lambda(
     except Exception as e:
         logger.error(f"Unexpected error during lambda login: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post(
+    "/service-token/lambda",
+    dependencies=[Depends(verify_lambda_api_key)],
+    response_model=ServiceTokenResponse,
+    summary="Lambda専用サービストークン発行API",
+    description=(
+        "Lambdaからの呼び出し専用。未登録ユーザ取得API（missing-schedule スコープ）だけに使える長期トークンを返します。"
+        "パスワード認証・DB参照は行いません。"
+    ),
+)
+def issue_lambda_service_token():
+    scopes = [MISSING_SCHEDULE_SCOPE]
+    token = create_service_token("lambda", scopes)
+    logger.info(f"Issued lambda service token: scopes={scopes}")
+    return ServiceTokenResponse(
+        access_token=token,
+        expires_in=settings.service_token_expire_minutes * 60,
+        scopes=scopes
+    )
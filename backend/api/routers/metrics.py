@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+
+from core.cache import schedule_cache
+from core.events import schedule_events
+from core.rate_limit import rate_limiter
+from core.security import get_current_user
+from db import pool_status
+
+router = APIRouter(
+    dependencies=[Depends(get_current_user)]
+)
+
+@router.get(
+        "/metrics",
+        summary="運用メトリクスの取得",
+        description="DBコネクションプールの使用状況・チェックアウト待ち時間と、スケジュールキャッシュのヒット率、リアルタイム配信の購読数、レート制限の状況を返します",
+        response_description="メトリクス情報"
+        )
+def read_metrics():
+    return {
+        "db_pool": pool_status(),
+        "schedule_cache": schedule_cache.stats(),
+        "schedule_events": schedule_events.stats(),
+        "rate_limit": rate_limiter.stats(),
+    }
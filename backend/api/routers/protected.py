@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends
 
-from core.security import get_current_user
-from models.user_model import User
+from core.security import Principal, get_current_user
 from schemas.user_schema import UserResponse
 
 router = APIRouter(
@@ -15,5 +14,5 @@ router = APIRouter(
         response_description="現在のユーザ情報",
         response_model=UserResponse 
         )
-def read_me(current_user: User = Depends(get_current_user)):
+def read_me(current_user: Principal = Depends(get_current_user)):
     return current_user
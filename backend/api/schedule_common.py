@@ -0,0 +1,70 @@
+# api/schedule_common.py
+# 同期版（api/schedules.py）と非同期版（api/schedules_async.py）のルートで共通のリクエスト検証とレスポンス組み立て
+# 各ルートに残すのは DB アクセス（crud/schedule.py・crud/schedule_async.py の呼び出し）だけにする
+
+import logging
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+from core.cache import schedule_cache
+from core.http_cache import build_etag, cache_headers, is_not_modified
+from crud.data_version import schedule_month_key
+from models.data_version_model import DataVersion
+from utils.date_utils import parse_month
+
+logger = logging.getLogger(__name__)
+
+def parse_month_param(month: str) -> date:
+    """クエリの `month`（YYYY-MM）を月初日に変換する（不正な場合は 422）"""
+    try:
+        return parse_month(month)
+    except ValueError:
+        logger.warning(f"Invalid month format: {month}")
+        raise HTTPException(status_code=422, detail="month must be in YYYY-MM format")
+
+def parse_list_params(month: Optional[str], fmt: str) -> Optional[date]:
+    """GET /schedules の `month`・`format` を検証し、月指定の場合は月初日を返す"""
+    first_day = parse_month_param(month) if month is not None else None
+    if fmt == "grid" and first_day is None:
+        raise HTTPException(status_code=422, detail="month is required for grid format")
+    return first_day
+
+def is_delete_request(location: Optional[str]) -> bool:
+    # location が null または空なら削除
+    return location is None or location.strip() == ""
+
+class MonthScheduleResponse:
+    """月別スケジュールのレスポンス（月別バージョンによる ETag・304 とシリアライズ済みレスポンスのキャッシュ）
+
+    バージョンの取得とペイロードの生成（DB アクセス）は呼び出し側で行う
+    """
+
+    def __init__(self, request: Request, month: str, fmt: str, version: Optional[DataVersion]):
+        self.request = request
+        self.month = month
+        self.fmt = fmt
+        self.etag = build_etag(schedule_month_key(parse_month(month)), version, fmt)
+        self.headers = cache_headers(self.etag, version)
+
+    def lookup(self) -> Optional[Response]:
+        """304 またはキャッシュ済みのレスポンス。どちらでもない場合は None（store でペイロードを渡す）"""
+        if is_not_modified(self.request, self.etag):
+            logger.debug(f"Schedules not modified for month={self.month}")
+            return Response(status_code=304, headers=self.headers)
+
+        body = schedule_cache.get(self.month, self.fmt, self.etag)
+        if body is None:
+            return None
+        logger.debug(f"Schedule cache hit for month={self.month} format={self.fmt}")
+        return self._response(body)
+
+    def store(self, body: bytes) -> Response:
+        schedule_cache.set(self.month, self.fmt, self.etag, body)
+        logger.info(f"Fetched schedules for month={self.month} format={self.fmt} ({len(body)} bytes)")
+        return self._response(body)
+
+    def _response(self, body: bytes) -> Response:
+        # シリアライズ済みのため、レスポンスモデルでの1件ごとの検証も省く
+        return Response(content=body, media_type="application/json", headers=self.headers)
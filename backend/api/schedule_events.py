@@ -0,0 +1,65 @@
+# api/schedule_events.py
+
+import asyncio
+import json
+import logging
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from api.schedule_common import parse_month_param
+from config import settings
+from core.events import schedule_events
+from core.security import get_current_user_for_stream
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    dependencies=[Depends(get_current_user_for_stream)]
+)
+
+@router.get(
+    "/schedules/events",
+    summary="作業場所スケジュールの変更通知（Server-Sent Events）",
+    description=(
+        "指定した月（`month`）の作業場所スケジュールの変更を Server-Sent Events で通知します\n"
+        "`changes` イベント: 変更されたセル（user_id, work_date, location。削除時は location が null）\n"
+        "`resync` イベント: 一括取り込みや通知の取りこぼしがあったため、月のスケジュールを再取得してください"
+        ),
+    response_description="text/event-stream のストリームを返します",
+    response_class=StreamingResponse
+)
+async def stream_schedule_events(request: Request, month: str = Query(...)):
+    parse_month_param(month)
+
+    return StreamingResponse(
+        _event_stream(request, month),
+        media_type="text/event-stream",
+        # プロキシでバッファリングさせない
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _format_event(message: dict) -> bytes:
+    data = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {message['type']}\ndata: {data}\n\n".encode("utf-8")
+
+async def _event_stream(request: Request, month: str):
+    async with schedule_events.subscribe(month) as subscription:
+        logger.debug(f"Subscribed to schedule events for month={month}")
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.live_updates_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # 接続維持のためのコメント行
+                yield b": keep-alive\n\n"
+                continue
+
+            yield _format_event(message)
+            if message["type"] == "resync" and subscription.lagged:
+                # 取りこぼした購読は終了し、クライアントに再取得・再接続させる
+                break
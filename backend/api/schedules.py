@@ -1,17 +1,33 @@
 # api/schedule.py
 
 import logging
-from datetime import date
-from typing import List, Optional,Union
+from datetime import date, timedelta
+from typing import List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from api.schedule_common import MonthScheduleResponse, is_delete_request, parse_list_params, parse_month_param
+from core.http_cache import build_etag, cache_headers, is_not_modified
 from core.security import get_current_user, verify_csrf_token
-from db import SessionLocal
+from db import SessionLocal, get_db
+from crud import data_version as crud_version
 from crud import schedule as crud_schedule
-from schemas.schedule_schema import ScheduleRequest, ScheduleResponse
+from crud import schedule_change as crud_change
+from schemas.schedule_schema import (
+    ScheduleBulkRequest,
+    ScheduleBulkResult,
+    ScheduleChangesResponse,
+    ScheduleCopyRequest,
+    ScheduleGridResponse,
+    ScheduleRequest,
+    ScheduleResponse,
+    ScheduleSummaryResponse,
+)
+from utils.date_utils import month_range, months_in_range
+from utils.export_utils import iter_csv, iter_xlsx
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +35,32 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# 集計・出力で指定できる期間の上限（年度単位の出力を想定）
+MAX_RANGE_DAYS = 366
+
+def resolve_date_range(
+    month: Optional[str], start_date: Optional[date], end_date: Optional[date]
+) -> Tuple[date, date]:
+    """`month` または `start_date`〜`end_date`（終了日を含む）を [開始日, 翌日) の半開区間に変換する"""
+    if month is not None:
+        if start_date is not None or end_date is not None:
+            raise HTTPException(status_code=422, detail="Specify either month or start_date/end_date")
+        parse_month_param(month)
+        return month_range(month)
+
+    if start_date is None or end_date is None:
+        raise HTTPException(status_code=422, detail="month or start_date/end_date is required")
+    if end_date < start_date:
+        raise HTTPException(status_code=422, detail="end_date must be on or after start_date")
+    end = end_date + timedelta(days=1)
+    if (end - start_date).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=422, detail=f"Date range must be within {MAX_RANGE_DAYS} days")
+    return start_date, end
 
 @router.post(
         "/schedules",
@@ -39,12 +75,10 @@ def get_db():
     )
 def add_or_update_schedule(data: ScheduleRequest, db: Session = Depends(get_db)):
     try:
-        existing = crud_schedule.get_schedule(db, data.user_id, data.work_date)
-
         # location が null または空なら削除処理
-        if data.location is None or data.location.strip() == "":
-            if existing:
-                crud_schedule.delete_schedule(db, existing)
+        if is_delete_request(data.location):
+            deleted_id = crud_schedule.delete_schedule(db, data.user_id, data.work_date)
+            if deleted_id is not None:
                 logger.info(f"Deleted schedule for user_id={data.user_id} on {data.work_date}")
             return {"status": "deleted"}
 
@@ -62,22 +96,101 @@ def add_or_update_schedule(data: ScheduleRequest, db: Session = Depends(get_db))
         logger.exception("Unexpected error in add_or_update_schedule")
         raise HTTPException(status_code=500, detail="Unexpected error occurred")
 
+@router.post(
+        "/schedules/bulk",
+        dependencies=[Depends(verify_csrf_token)],
+        summary="作業場所スケジュールの一括登録・更新",
+        description=(
+            "複数の作業場所スケジュールを1トランザクションでまとめて登録・更新・削除します\n"
+            "作業場所が空またはnullの項目は削除されます"
+            ),
+        response_description="項目ごとの反映結果を返します",
+        response_model=List[ScheduleBulkResult],
+    )
+def bulk_update_schedules(data: ScheduleBulkRequest, db: Session = Depends(get_db)):
+    try:
+        results = crud_schedule.bulk_apply_schedules(
+            db, ((item.user_id, item.work_date, item.location) for item in data.items)
+        )
+        logger.info(f"Bulk applied {len(results)} schedules")
+        return results
+
+    except crud_schedule.UnknownUsers as e:
+        logger.warning(f"Unknown user_id in bulk_update_schedules: {e.user_ids}")
+        raise HTTPException(status_code=422, detail=f"Unknown user_id: {', '.join(map(str, e.user_ids))}")
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"DB error in bulk_update_schedules: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in bulk_update_schedules")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.post(
+        "/schedules/copy",
+        dependencies=[Depends(verify_csrf_token)],
+        summary="作業場所スケジュールの月コピー",
+        description=(
+            "指定されたユーザの作業場所スケジュールを、コピー元の月からコピー先の月の同じ日付へコピーします\n"
+            "コピー先の月に存在しない日はスキップされます"
+            ),
+        response_description="項目ごとの反映結果を返します",
+        response_model=List[ScheduleBulkResult],
+    )
+def copy_month_schedules(data: ScheduleCopyRequest, db: Session = Depends(get_db)):
+    try:
+        results = crud_schedule.copy_month_schedules(db, data.user_id, data.source_month, data.target_month)
+        logger.info(
+            f"Copied {len(results)} schedules for user_id={data.user_id} "
+            f"from {data.source_month} to {data.target_month}"
+        )
+        return results
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"DB error in copy_month_schedules: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in copy_month_schedules")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
 @router.get(
     "/schedules",
     summary="作業場所スケジュールの取得",
     description=(
         "作業場所スケジュールを取得します\n"
         "オプションで `month` を指定することで、特定の月（例: '2025-05'）のスケジュールだけを取得できます\n"
-        "取得されるデータには、ユーザID、勤務日、作業場所が含まれます"
+        "取得されるデータには、ユーザID、勤務日、作業場所が含まれます\n"
+        "`format=grid` を指定すると、日付 × ユーザのコンパクトなグリッド形式で返します（`month` 必須）"
         ),
-    response_description="作業場所スケジュールのリストを返します",
-    response_model=List[ScheduleResponse]
+    response_description="作業場所スケジュールのリスト、またはグリッド形式のスケジュールを返します",
+    response_model=Union[List[ScheduleResponse], ScheduleGridResponse]
 )
-def list_schedules(month: Optional[str] = Query(None), db: Session = Depends(get_db)):
+def list_schedules(
+    request: Request,
+    month: Optional[str] = Query(None),
+    format: str = Query("list", pattern="^(list|grid)$"),
+    db: Session = Depends(get_db)
+):
+    first_day = parse_list_params(month, format)
+
     try:
-        results = crud_schedule.get_schedules_by_month(db, month)
-        logger.info(f"Fetched {len(results)} schedules for month={month}")
-        return results
+        if first_day is None:
+            results = crud_schedule.get_schedules_by_month(db, month)
+            logger.info(f"Fetched {len(results)} schedules for month={month}")
+            return results
+
+        # 月指定時は月別バージョンで条件付き GET に対応する（スケジュールテーブルは参照しない）
+        cached = MonthScheduleResponse(
+            request, month, format, crud_version.get_version(db, crud_version.schedule_month_key(first_day))
+        )
+        response = cached.lookup()
+        if response is None:
+            response = cached.store(crud_schedule.get_month_payload(db, month, format))
+        return response
 
     except SQLAlchemyError as e:
         logger.error(f"DB error in list_schedules: {e}")
@@ -86,3 +199,124 @@ def list_schedules(month: Optional[str] = Query(None), db: Session = Depends(get
     except Exception as e:
         logger.exception("Unexpected error in list_schedules")
         raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.get(
+    "/schedules/summary",
+    summary="作業場所の集計",
+    description=(
+        "指定した月（`month`）または期間（`start_date`〜`end_date`、終了日を含む）について、"
+        "ユーザごとの作業場所別の日数を集計します\n"
+        "集計はデータベースで行うため、スケジュール明細は転送しません（期間は最大366日）"
+        ),
+    response_description="ユーザごとの作業場所別日数を返します",
+    response_model=ScheduleSummaryResponse
+)
+def get_schedule_summary(
+    request: Request,
+    response: Response,
+    month: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    db: Session = Depends(get_db)
+):
+    start, end = resolve_date_range(month, start_date, end_date)
+
+    try:
+        # 期間内の各月とユーザ一覧のバージョンから ETag を作る（いずれかが更新されると変わる）
+        keys = [crud_version.schedule_month_key(first_day) for first_day in months_in_range(start, end)]
+        keys.append(crud_version.USERS_KEY)
+        version = crud_version.get_combined_version(db, keys)
+        etag = build_etag(f"schedule-summary:{start}:{end}", version)
+        headers = cache_headers(etag, version)
+        if is_not_modified(request, etag):
+            logger.debug(f"Schedule summary not modified for {start} - {end}")
+            return Response(status_code=304, headers=headers)
+
+        summary = crud_schedule.get_location_summary(db, start, end)
+        logger.info(f"Summarized schedules for {start} - {end}: {len(summary['users'])} users")
+        response.headers.update(headers)
+        return summary
+
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in get_schedule_summary: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in get_schedule_summary")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.get(
+    "/schedules/export",
+    summary="作業場所スケジュールの出力",
+    description=(
+        "指定した月（`month`）または期間（`start_date`〜`end_date`、終了日を含む）のスケジュールを、"
+        "ユーザ × 日付の表形式で CSV（`format=csv`）または Excel（`format=xlsx`）として出力します\n"
+        "スケジュールのないユーザも空欄の行として出力されます（期間は最大366日）"
+        ),
+    response_description="CSV または XLSX ファイルを返します",
+    response_class=StreamingResponse
+)
+def export_schedules(
+    month: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    format: str = Query("csv", pattern="^(csv|xlsx)$")
+):
+    start, end = resolve_date_range(month, start_date, end_date)
+    last_day = end - timedelta(days=1)
+    filename = f"schedules_{start:%Y%m%d}_{last_day:%Y%m%d}.{format}"
+    logger.info(f"Exporting schedules for {start} - {last_day} as {format}")
+    return StreamingResponse(
+        _stream_export(start, end, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _stream_export(start: date, end: date, fmt: str):
+    # レスポンス送信中もセッションを保持するため、依存関係とは別にセッションを開く
+    db = SessionLocal()
+    try:
+        rows = crud_schedule.iter_export_rows(db, start, end)
+        chunks = iter_xlsx(rows) if fmt == "xlsx" else iter_csv(rows)
+        yield from chunks
+    except SQLAlchemyError as e:
+        # 送信開始後はステータスを変えられないため、ログに残して打ち切る
+        logger.error(f"DB error in export_schedules: {e}")
+        raise
+    finally:
+        db.close()
+
+@router.get(
+    "/schedules/changes",
+    summary="作業場所スケジュールの差分取得",
+    description=(
+        "指定した月（`month`）について、カーソル（`since`）以降に変更されたセルだけを返します\n"
+        "`since` を省略すると現在のカーソルだけを返します（その後に月全体を取得し、以降は差分を取得します）\n"
+        "カーソルは月ごとの値です。別の月の取得には使わないでください\n"
+        "古い変更履歴は定期的に削除されるため、`reset` が true の場合は月全体を取得し直してください"
+        ),
+    response_description="変更されたセルと次回のカーソルを返します",
+    response_model=ScheduleChangesResponse
+)
+def get_schedule_changes(
+    month: str = Query(...),
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    parse_month_param(month)
+
+    try:
+        result = crud_change.get_changes(db, month, since, limit)
+        logger.debug(
+            f"Fetched {len(result['changes'])} schedule changes for month={month} since={since} (reset={result['reset']})"
+        )
+        return result
+
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in get_schedule_changes: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in get_schedule_changes")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
@@ -0,0 +1,166 @@
+# api/schedules_async.py
+# settings.db_async が有効な場合に api/schedules.py の主要ルートを置き換える非同期版
+
+import logging
+from typing import List, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.schedule_common import MonthScheduleResponse, is_delete_request, parse_list_params
+from core.security import get_current_user_async, verify_csrf_token
+from db import get_async_db
+from crud import data_version as crud_version
+from crud import data_version_async as crud_version_async
+from crud import schedule_async as crud_schedule
+from crud.schedule import UnknownUsers
+from models.schedule_model import WorkSchedule
+from schemas.schedule_schema import (
+    ScheduleBulkRequest,
+    ScheduleBulkResult,
+    ScheduleCopyRequest,
+    ScheduleGridResponse,
+    ScheduleRequest,
+    ScheduleResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    dependencies=[Depends(get_current_user_async)]
+)
+
+@router.post(
+        "/schedules",
+        dependencies=[Depends(verify_csrf_token)],
+        summary="作業場所スケジュールの登録・更新",
+        description=(
+            "指定されたユーザの作業場所スケジュールを登録または更新します\n"
+            "作業場所が空またはnullの場合は削除されます"
+            ),
+        response_description="登録・更新された作業場所スケジュール情報、または削除ステータスを返します",
+        response_model=Union[ScheduleResponse, dict],
+    )
+async def add_or_update_schedule(data: ScheduleRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        if is_delete_request(data.location):
+            deleted_id = await crud_schedule.delete_schedule(db, data.user_id, data.work_date)
+            if deleted_id is not None:
+                logger.info(f"Deleted schedule for user_id={data.user_id} on {data.work_date}")
+            return {"status": "deleted"}
+
+        schedule = await crud_schedule.save_schedule(db, data.user_id, data.work_date, data.location)
+        logger.info(f"Saved schedule: {schedule}")
+        return schedule
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"DB error in add_or_update_schedule: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in add_or_update_schedule")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.post(
+        "/schedules/bulk",
+        dependencies=[Depends(verify_csrf_token)],
+        summary="作業場所スケジュールの一括登録・更新",
+        description=(
+            "複数の作業場所スケジュールを1トランザクションでまとめて登録・更新・削除します\n"
+            "作業場所が空またはnullの項目は削除されます"
+            ),
+        response_description="項目ごとの反映結果を返します",
+        response_model=List[ScheduleBulkResult],
+    )
+async def bulk_update_schedules(data: ScheduleBulkRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        results = await crud_schedule.bulk_apply_schedules(
+            db, ((item.user_id, item.work_date, item.location) for item in data.items)
+        )
+        logger.info(f"Bulk applied {len(results)} schedules")
+        return results
+
+    except UnknownUsers as e:
+        logger.warning(f"Unknown user_id in bulk_update_schedules: {e.user_ids}")
+        raise HTTPException(status_code=422, detail=f"Unknown user_id: {', '.join(map(str, e.user_ids))}")
+
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in bulk_update_schedules: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in bulk_update_schedules")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.post(
+        "/schedules/copy",
+        dependencies=[Depends(verify_csrf_token)],
+        summary="作業場所スケジュールの月コピー",
+        description=(
+            "指定されたユーザの作業場所スケジュールを、コピー元の月からコピー先の月の同じ日付へコピーします\n"
+            "コピー先の月に存在しない日はスキップされます"
+            ),
+        response_description="項目ごとの反映結果を返します",
+        response_model=List[ScheduleBulkResult],
+    )
+async def copy_month_schedules(data: ScheduleCopyRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        results = await crud_schedule.copy_month_schedules(db, data.user_id, data.source_month, data.target_month)
+        logger.info(
+            f"Copied {len(results)} schedules for user_id={data.user_id} "
+            f"from {data.source_month} to {data.target_month}"
+        )
+        return results
+
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in copy_month_schedules: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in copy_month_schedules")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.get(
+    "/schedules",
+    summary="作業場所スケジュールの取得",
+    description=(
+        "作業場所スケジュールを取得します\n"
+        "オプションで `month` を指定することで、特定の月（例: '2025-05'）のスケジュールだけを取得できます\n"
+        "`format=grid` を指定すると、日付 × ユーザのコンパクトなグリッド形式で返します（`month` 必須）"
+        ),
+    response_description="作業場所スケジュールのリスト、またはグリッド形式のスケジュールを返します",
+    response_model=Union[List[ScheduleResponse], ScheduleGridResponse]
+)
+async def list_schedules(
+    request: Request,
+    month: Optional[str] = Query(None),
+    format: str = Query("list", pattern="^(list|grid)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    first_day = parse_list_params(month, format)
+
+    try:
+        if first_day is None:
+            results = list(await db.scalars(select(WorkSchedule)))
+            logger.info(f"Fetched {len(results)} schedules for month={month}")
+            return results
+
+        cached = MonthScheduleResponse(
+            request, month, format,
+            await crud_version_async.get_version(db, crud_version.schedule_month_key(first_day))
+        )
+        response = cached.lookup()
+        if response is None:
+            response = cached.store(await crud_schedule.get_month_payload(db, month, format))
+        return response
+
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in list_schedules: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+    except Exception as e:
+        logger.exception("Unexpected error in list_schedules")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
@@ -1,17 +1,22 @@
 # api/user.py
 
+import json
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterator, List, Optional
 
-from core.security import get_current_user, verify_csrf_token
-from db import SessionLocal
+from core.http_cache import build_etag, cache_headers, is_not_modified
+from core.security import MISSING_SCHEDULE_SCOPE, Principal, get_current_user, require_scope, verify_csrf_token
+from db import SessionLocal, get_db
+from crud import data_version as crud_version
 from crud import user as crud_user
-from schemas.user_schema import UserResponse, AllowanceUpdate  # ← スキーマを import
-from models.user_model import User  # current_user 依存関係で使うため必要
+from services import calendar_service
+from schemas.user_schema import UserResponse, AllowanceUpdate, ScheduleCoverageResponse  # ← スキーマを import
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +24,8 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Lambda 等のサービストークンでも呼び出せるルート（ユーザ認証の代わりにスコープを検証する）
+service_router = APIRouter()
 
 @router.post(
     "/users",
@@ -55,13 +56,24 @@ def create_user(name: str, db: Session = Depends(get_db)):
     response_model=List[UserResponse]
 )
 def list_users(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
+        # 並び順がログインユーザに依存するため、ETag にユーザIDを含める
+        version = crud_version.get_version(db, crud_version.USERS_KEY)
+        etag = build_etag(crud_version.USERS_KEY, version, current_user.id)
+        headers = cache_headers(etag, version)
+        if is_not_modified(request, etag):
+            logger.debug("Users not modified")
+            return Response(status_code=304, headers=headers)
+
         #users = crud_user.get_all_users(db)
         users = crud_user.get_all_users(db, current_user_id=current_user.id)
         logger.info(f"Fetched {len(users)} users")
+        response.headers.update(headers)
         return users
     except SQLAlchemyError as e:
         logger.error(f"DB error in list_users: {e}")
@@ -93,16 +105,58 @@ def update_commuting_allowance(user_id: int, allowance_update: AllowanceUpdate,
         logger.exception("Unexpected error in update_commuting_allowance")
         raise HTTPException(status_code=500, detail="Unexpected error occurred")
 
-@router.get(
+@service_router.get(
     "/users/missing-schedule",
-    dependencies=[], # ここだけヘッダー認証とする（lambdaから実行するため）
+    dependencies=[Depends(require_scope(MISSING_SCHEDULE_SCOPE))], # ヘッダー認証（lambdaから実行するため）
     summary="スケジュール未登録ユーザの取得",
-    description="指定された年月に勤務スケジュールが未登録のユーザを取得します",
+    description=(
+        "指定された年月に勤務スケジュールが未登録のユーザを取得します\n"
+        "`fields`（例: 'email'）を指定すると指定した項目だけを返します\n"
+        "`limit` を指定すると id 順のキーセットページングになり、次ページのカーソルを `X-Next-Cursor` ヘッダーで返します"
+        "（次ページは `after_id` に指定）\n"
+        "`format=ndjson` を指定すると、全件を1行1ユーザの NDJSON でストリーミングします"
+        "（最後の行は `{\"done\": true, \"count\": 件数}`。この行がない場合は途中で打ち切られています）"
+    ),
     response_description="未登録ユーザのリストを返します",
     response_model=List[UserResponse]
 )
-def get_users_missing_schedule(year: int, month: int, db: Session = Depends(get_db)):
+def get_users_missing_schedule(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    fields: Optional[str] = Query(None, description="カンマ区切りの取得項目"),
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    field_list = list(crud_user.USER_FIELDS)
+    if fields:
+        field_list = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in field_list if field not in crud_user.USER_FIELDS]
+        if unknown or not field_list:
+            raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+
     try:
+        if format == "ndjson":
+            logger.info(f"Streaming missing-schedule users for {year}-{month} as NDJSON")
+            return StreamingResponse(
+                _stream_missing_users(year, month, field_list),
+                media_type="application/x-ndjson"
+            )
+
+        if limit is not None:
+            page, next_cursor = crud_user.get_users_missing_schedule_page(
+                db, year, month, field_list, after_id, limit
+            )
+            logger.info(f"{year}年{month}月の未登録ユーザー: {len(page)}件 (after_id={after_id})")
+            headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+            return JSONResponse(content=jsonable_encoder(page), headers=headers)
+
+        if fields:
+            rows = list(crud_user.iter_users_missing_schedule(db, year, month, field_list))
+            logger.info(f"{year}年{month}月の未登録ユーザー数: {len(rows)}")
+            return JSONResponse(content=jsonable_encoder(rows))
+
         users = crud_user.get_users_missing_schedule(db, year, month)
         logger.info(f"{year}年{month}月の未登録ユーザー数: {len(users)}")
         return users
@@ -112,3 +166,50 @@ def get_users_missing_schedule(year: int, month: int, db: Session = Depends(get_
     except Exception as e:
         logger.exception("Unexpected error in get_users_missing_schedule")
         raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+def _stream_missing_users(year: int, month: int, fields: List[str]) -> Iterator[bytes]:
+    # レスポンス送信中もセッションを保持するため、依存関係とは別にセッションを開く
+    db = SessionLocal()
+    count = 0
+    try:
+        for row in crud_user.iter_users_missing_schedule(db, year, month, fields):
+            yield json.dumps(jsonable_encoder(row), ensure_ascii=False).encode("utf-8") + b"\n"
+            count += 1
+    except SQLAlchemyError as e:
+        # 送信開始後はステータスを変えられないため、終端の行を送らずに打ち切る（クライアントは途中終了と判断する）
+        logger.error(f"DB error in _stream_missing_users after {count} rows: {e}")
+        return
+    finally:
+        db.close()
+    yield json.dumps({"done": True, "count": count}).encode("utf-8") + b"\n"
+
+@router.get(
+    "/users/schedule-coverage",
+    summary="スケジュール登録状況の取得",
+    description=(
+        "指定された年月の営業日（土日・祝日を除く）に対する、ユーザごとの作業場所スケジュールの登録日数を集計します\n"
+        "`status` を指定すると、未登録（missing）・一部未登録（partial）・登録済み（complete）で絞り込めます"
+    ),
+    response_description="ユーザごとの登録状況のリストを返します",
+    response_model=List[ScheduleCoverageResponse]
+)
+def get_schedule_coverage(
+    year: int,
+    month: int = Query(..., ge=1, le=12),
+    status: Optional[str] = Query(None, pattern="^(missing|partial|complete)$"),
+    db: Session = Depends(get_db)
+):
+    try:
+        coverage = crud_user.get_schedule_coverage(db, year, month, calendar_service.get_holidays(year))
+        if status is not None:
+            coverage = [c for c in coverage if c["status"] == status]
+        logger.info(f"{year}年{month}月の登録状況: {len(coverage)}件 (status={status})")
+        return coverage
+    except calendar_service.UnsupportedCalendarYear as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in get_schedule_coverage: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+    except Exception as e:
+        logger.exception("Unexpected error in get_schedule_coverage")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
@@ -0,0 +1,83 @@
+# api/user_async.py
+# settings.db_async が有効な場合に api/user.py の主要ルートを置き換える非同期版
+
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from core.http_cache import build_etag, cache_headers, is_not_modified
+from core.security import Principal, get_current_user_async, verify_csrf_token
+from db import get_async_db
+from crud import data_version as crud_version
+from crud import data_version_async as crud_version_async
+from crud import user_async as crud_user
+from schemas.user_schema import UserResponse, AllowanceUpdate
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    dependencies=[Depends(get_current_user_async)]
+)
+
+@router.get(
+    "/users",
+    summary="全ユーザの一覧取得",
+    description="登録されている全ユーザの一覧を取得します",
+    response_description="ユーザ情報のリストを返します",
+    response_model=List[UserResponse]
+)
+async def list_users(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    try:
+        version = await crud_version_async.get_version(db, crud_version.USERS_KEY)
+        etag = build_etag(crud_version.USERS_KEY, version, current_user.id)
+        headers = cache_headers(etag, version)
+        if is_not_modified(request, etag):
+            logger.debug("Users not modified")
+            return Response(status_code=304, headers=headers)
+
+        users = await crud_user.get_all_users(db, current_user_id=current_user.id)
+        logger.info(f"Fetched {len(users)} users")
+        response.headers.update(headers)
+        return users
+    except SQLAlchemyError as e:
+        logger.error(f"DB error in list_users: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+    except Exception as e:
+        logger.exception("Unexpected error in list_users")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
+
+@router.patch(
+    "/users/{user_id}/commuting_allowance",
+    dependencies=[Depends(verify_csrf_token)],
+    summary="通勤手当の更新",
+    description="指定されたユーザの通勤手当の状態（申請・停止・不要など）を更新します",
+    response_description="更新の結果メッセージを返します"
+)
+async def update_commuting_allowance(
+    user_id: int,
+    allowance_update: AllowanceUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        user = await crud_user.update_commuting_allowance(db, user_id, allowance_update.allowance)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        logger.info(f"Updated commuting_allowance for user_id={user_id} to {allowance_update.allowance}")
+        return {"message": "Updated successfully"}
+    except HTTPException:
+        raise
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"DB error in update_commuting_allowance: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+    except Exception as e:
+        logger.exception("Unexpected error in update_commuting_allowance")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
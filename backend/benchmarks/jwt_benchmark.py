@@ -0,0 +1,44 @@
+"""トークン検証のマイクロベンチマーク
+
+各 JWT バックエンドでの署名検証と、検証済みトークンキャッシュのヒット時の1回あたりの時間を比較する
+
+    cd backend && python benchmarks/jwt_benchmark.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import jwt_backend as backends  # noqa: E402
+from core.cache import token_cache  # noqa: E402
+from core.security import create_access_token  # noqa: E402
+
+def per_call_us(func, token: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(token)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description="トークン検証のマイクロベンチマーク")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = create_access_token(1)
+    for name in backends.JWT_BACKENDS:
+        try:
+            backend = backends.create_backend(name)
+        except ImportError:
+            print(f"{name:>12}: not installed")
+            continue
+        print(f"{name:>12}: {per_call_us(backend.decode, token, args.iterations):8.2f} us/decode")
+
+    token_cache.clear()
+    backends.verify_token(token)
+    print(f"{'cached':>12}: {per_call_us(backends.verify_token, token, args.iterations):8.2f} us/verify "
+          f"(backend={type(backends.jwt_backend).__name__})")
+
+if __name__ == "__main__":
+    main()
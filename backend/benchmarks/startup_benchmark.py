@@ -0,0 +1,51 @@
+"""アプリ起動時間の計測
+
+新しいプロセスで `import main`（アプリ作成まで）にかかる時間を複数回計測する
+DB には接続しない（エンジンは最初のリクエストまで作成されない）
+
+    cd backend && python benchmarks/startup_benchmark.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MEASURE = """
+import time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+import sys
+print(elapsed, len(sys.modules))
+"""
+
+def measure_once() -> tuple:
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    elapsed, modules = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed) * 1000, int(modules)
+
+def main():
+    parser = argparse.ArgumentParser(description="アプリ起動時間の計測")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    timings = []
+    modules = 0
+    for _ in range(args.runs):
+        elapsed_ms, modules = measure_once()
+        timings.append(elapsed_ms)
+
+    print(f"runs={args.runs} modules={modules}")
+    print(
+        f"import main: min={min(timings):.1f}ms "
+        f"median={statistics.median(timings):.1f}ms max={max(timings):.1f}ms"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""スケジュールの変更履歴のコンパクション（cron 等で定期的に実行する）
+
+    python compact_schedule_changes.py            # 保持期間（SCHEDULE_CHANGE_RETENTION_DAYS）より古い履歴を削除
+    python compact_schedule_changes.py --days 3
+"""
+import argparse
+import logging
+
+from datetime import datetime, timedelta, timezone
+
+from config import settings
+from crud.schedule_change import compact_changes
+from db import SessionLocal
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="スケジュールの変更履歴のコンパクション")
+    parser.add_argument("--days", type=int, default=settings.schedule_change_retention_days)
+    args = parser.parse_args()
+
+    before = datetime.now(timezone.utc) - timedelta(days=args.days)
+    db = SessionLocal()
+    try:
+        deleted = compact_changes(db, before)
+    finally:
+        db.close()
+    logger.info(f"Deleted {deleted} schedule changes before {before.isoformat()}")
+
+if __name__ == "__main__":
+    main()
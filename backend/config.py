@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).resolve().parent  # 例えば backend ディレクトリ
@@ -17,18 +18,92 @@ class Settings(BaseSettings):
     postgres_host: str = "db"
     postgres_port: int = 5432
 
+    # True の場合、スケジュール・ユーザ一覧の主要 API を asyncpg ベースの非同期セッションで処理する
+    db_async: bool = False
+
+    # コネクションプール
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # 秒
+    db_pool_recycle: int = 1800  # 秒
+    db_pool_pre_ping: bool = True
+    db_pool_slow_checkout_ms: int = 100  # これ以上の待ち時間を警告ログに出す
+    db_statement_timeout_ms: int = 0  # 0 の場合は無効
+    db_external_pooler: bool = False  # PgBouncer 等を使う場合は True（NullPool）
+
     secret_key: str = "your-secret-key"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 15
     refresh_token_expire_minutes: int = 60 * 24 * 7  # 7日
+    refresh_reuse_grace_seconds: int = 30  # 複数タブからの同時リフレッシュを許容する猶予
+    jwt_backend: str = "jose"  # jose: python-jose / pyjwt: PyJWT（検証が速い）
 
     smtp_host: str = "smtp.gmail.com"
     smtp_port: int = 587
     smtp_user: str = "your-email@example.com"
     smtp_password: str = "your_password"
+    smtp_starttls: bool = True
+    smtp_login: bool = True  # ローカルの SMTP スタブなど認証不要な場合は False
+    smtp_pool_size: int = 4  # 接続プールのサイズ（＝同時送信数）
+    smtp_max_messages_per_connection: int = 100
+    smtp_max_retries: int = 3
+    smtp_retry_backoff_seconds: float = 1.0
 
     lambda_api_key: str = "your-lambda-apy-key"
 
+    # サービストークン（Lambda 等の機械クライアント用）
+    service_token_expire_minutes: int = 60 * 24 * 30  # 30日
+    service_token_version: int = 1  # 上げると発行済みトークンを一括で無効化できる
+
+    # パスワードハッシュ（bcrypt）
+    bcrypt_rounds: int = 12  # 変更するとログイン時に自動で再ハッシュされる
+    password_hash_workers: int = 2  # ハッシュ処理用のプロセス数
+    password_hash_max_pending: int = 32  # 実行中・待機中の上限（超えた場合は 503）
+
+    # 月別スケジュールのレスポンスキャッシュ
+    schedule_cache_enabled: bool = True
+    schedule_cache_max_entries: int = 256
+    schedule_cache_ttl_seconds: int = 300
+
+    # 認証済みユーザ情報のキャッシュ（ワーカーごと。他ワーカーでの更新は TTL 経過で反映）
+    principal_cache_max_entries: int = 10000
+    principal_cache_ttl_seconds: int = 30
+
+    # 署名検証済みトークンのキャッシュ（ワーカーごと）
+    token_cache_max_entries: int = 10000
+    token_cache_ttl_seconds: int = 300
+
+    # スケジュール変更のリアルタイム配信（SSE）
+    live_updates_backend: str = "local"  # local: ワーカー内のみ / postgres: LISTEN/NOTIFY でワーカー間に配信
+    live_updates_queue_size: int = 100  # 接続ごとの未送信イベントの上限（超えた場合は再取得を促す）
+    live_updates_heartbeat_seconds: int = 15
+
+    # スケジュールの変更履歴（差分取得用）の保持期間
+    schedule_change_retention_days: int = 7
+
+    # レート制限（トークンバケット。'回数/second|minute|hour' 形式。空文字でその制限を無効化）
+    rate_limit_enabled: bool = True
+    # クライアントの IP アドレスは uvicorn の --proxy-headers と FORWARDED_ALLOW_IPS（nginx のアドレス）で
+    # X-Forwarded-For から取得する。設定しない場合はすべてのリクエストが nginx の IP アドレスで数えられる
+    rate_limit_default: str = "300/minute"  # 未認証のリクエストの IP アドレスごと（全ルート）
+    rate_limit_user: str = "600/minute"  # 認証済みユーザごと（全ルート）
+    # ルートごとの制限（'メソッド パスの前方一致' → 制限。認証済みならユーザごと、それ以外は IP ごと）
+    # ログインは未認証のため IP ごと（同じ NAT 配下の社員で共有するため、始業時の集中を見込んだ値にする）
+    rate_limit_routes: Dict[str, str] = {
+        "POST /api/auth/login": "60/minute",
+        "POST /api/auth/refresh": "30/minute",
+        "POST /api/imports": "10/minute",
+    }
+    rate_limit_backend: str = "local"  # local: ワーカー内のみ / postgres: ワーカー間で共有
+    rate_limit_sync_interval_seconds: float = 1.0
+    # 検証に失敗したトークン（改ざん・期限切れ）を覚えておく秒数（その間は署名検証せず未認証として IP ごとに数える）
+    rate_limit_invalid_token_ttl_seconds: int = 60
+    rate_limit_invalid_token_max_entries: int = 10000
+
+    # CSV 一括取り込み
+    import_max_errors: int = 1000  # 行ごとのエラー報告の上限件数
+    import_initial_password: str = ""  # 新規ユーザの初期パスワード（未設定の場合、ユーザの新規作成はエラー）
+
     model_config = SettingsConfigDict(
         env_file=str(BASE_DIR / f".env.{os.getenv('ENV', 'development')}"),
         env_file_encoding="utf-8"
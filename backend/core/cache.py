@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """キャッシュの保存先（複数ワーカー構成では共有キャッシュ実装に差し替える）"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+class LocalLRUCache(CacheBackend):
+    """プロセス内の LRU キャッシュ（件数上限・TTL 付き）
+
+    プロセス内で完結するため、bytes 以外のオブジェクトもそのまま保持できる
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class MonthCache:
+    """月別スケジュールのシリアライズ済みレスポンスを保持するキャッシュ
+
+    エントリは ETag と一緒に保存し、取得時に ETag が一致しない場合はミス扱いにする
+    （他ワーカーでの更新もバージョン経由で検知できる）
+    """
+
+    FORMATS = ("list", "grid")
+
+    def __init__(self, backend: CacheBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        # 複数スレッド（スレッドプールのハンドラ）から更新されるため、カウンタはロック下で更新する
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _key(month: str, fmt: str) -> str:
+        return f"schedules:{month}:{fmt}"
+
+    def get(self, month: str, fmt: str, etag: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        value = self.backend.get(self._key(month, fmt))
+        if value is not None:
+            cached_etag, _, body = value.partition(b"\n")
+            if cached_etag.decode() == etag:
+                with self._stats_lock:
+                    self.hits += 1
+                return body
+        with self._stats_lock:
+            self.misses += 1
+        return None
+
+    def set(self, month: str, fmt: str, etag: str, body: bytes):
+        if self.enabled:
+            self.backend.set(self._key(month, fmt), etag.encode() + b"\n" + body)
+
+    def invalidate(self, month: str):
+        for fmt in self.FORMATS:
+            self.backend.delete(self._key(month, fmt))
+        logger.debug(f"Invalidated schedule cache for month={month}")
+
+    def set_backend(self, backend: CacheBackend):
+        self.backend = backend
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+schedule_cache = MonthCache(
+    LocalLRUCache(
+        max_entries=settings.schedule_cache_max_entries,
+        ttl_seconds=settings.schedule_cache_ttl_seconds
+    ),
+    enabled=settings.schedule_cache_enabled
+)
+
+# 認証済みユーザのスナップショット（user_id → Principal）
+principal_cache = LocalLRUCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds
+)
+
+# 署名検証済みのトークン（トークンのダイジェスト → クレーム。exp は取得時に確認する）
+token_cache = LocalLRUCache(
+    max_entries=settings.token_cache_max_entries,
+    ttl_seconds=settings.token_cache_ttl_seconds
+)
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[dict], None]
+
+class BroadcastBackend(ABC):
+    """変更イベントの配信経路（複数ワーカー構成ではワーカー間で共有する実装に差し替える）
+
+    publish したメッセージは、発行元を含むすべてのワーカーの deliver に届ける
+    """
+
+    @abstractmethod
+    async def start(self, deliver: Deliver):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    @abstractmethod
+    def publish(self, message: dict):
+        """任意のスレッドから呼ばれる。ブロックしないこと"""
+        ...
+
+class LocalBroadcast(BroadcastBackend):
+    """プロセス内だけで配信する（単一ワーカー構成・テスト用）"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+
+    async def stop(self):
+        self._loop = None
+        self._deliver = None
+
+    def publish(self, message: dict):
+        if self._loop is None or self._deliver is None:
+            return
+        # 書き込みはスレッドプールで実行されるため、イベントループのスレッドで配信する
+        self._loop.call_soon_threadsafe(self._deliver, message)
+
+class PostgresBroadcast(BroadcastBackend):
+    """PostgreSQL の LISTEN / NOTIFY でワーカー間に配信する（専用の接続を1本使う）
+
+    接続が切れた場合は再接続し、切断中の通知は届いていないため購読者全員に再取得を促す
+    """
+
+    # NOTIFY のペイロード上限（8000 バイト）を超えないよう変更を分割する
+    MAX_PAYLOAD_BYTES = 7000
+    # 発行がない間も、この間隔で接続が生きているかを確認する
+    HEALTH_CHECK_SECONDS = 30.0
+    RECONNECT_DELAY_SECONDS = 3.0
+
+    def __init__(self, dsn: str, channel: str = "schedule_changes"):
+        self.dsn = dsn
+        self.channel = channel
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Deliver] = None
+        self._conn = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+        self._outbox = asyncio.Queue()
+        try:
+            await self._connect()
+        except Exception:
+            # 接続できなくても起動は続け、送信ループで再接続する
+            logger.exception("Failed to connect for schedule change events")
+        self._sender = asyncio.create_task(self._send_loop())
+
+    async def stop(self):
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        self._loop = None
+        self._deliver = None
+
+    def publish(self, message: dict):
+        if self._loop is None or self._outbox is None:
+            return
+        for payload in self._split(message):
+            self._loop.call_soon_threadsafe(self._outbox.put_nowait, payload)
+
+    def _split(self, message: dict) -> Iterable[str]:
+        payload = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        changes = message.get("changes")
+        if len(payload.encode("utf-8")) <= self.MAX_PAYLOAD_BYTES or not changes or len(changes) == 1:
+            yield payload
+            return
+        half = len(changes) // 2
+        yield from self._split({**message, "changes": changes[:half]})
+        yield from self._split({**message, "changes": changes[half:]})
+
+    def _on_notify(self, conn, pid, channel, payload):
+        self._deliver(json.loads(payload))
+
+    async def _connect(self):
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.channel, self._on_notify)
+        self._conn = conn
+
+    def _connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def _reconnect(self):
+        if self._conn is not None:
+            self._conn.terminate()
+            self._conn = None
+        while True:
+            try:
+                await self._connect()
+                break
+            except Exception as e:
+                logger.warning(f"Failed to reconnect for schedule change events: {e}")
+                await asyncio.sleep(self.RECONNECT_DELAY_SECONDS)
+        logger.info("Reconnected for schedule change events")
+        # 切断中の通知はこのワーカーに届いていない（どの月かは分からないため、すべての購読に再取得を促す）
+        self._deliver({"type": "resync"})
+
+    async def _send_loop(self):
+        payload = None
+        while True:
+            if not self._connected():
+                await self._reconnect()
+            if payload is None:
+                try:
+                    payload = await asyncio.wait_for(self._outbox.get(), timeout=self.HEALTH_CHECK_SECONDS)
+                except asyncio.TimeoutError:
+                    try:
+                        await self._conn.execute("SELECT 1")
+                    except Exception as e:
+                        logger.warning(f"Schedule change event connection is broken: {e}")
+                        self._conn.terminate()
+                    continue
+            try:
+                await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+            except Exception:
+                logger.exception("Failed to publish schedule change event")
+                if not self._connected():
+                    # 再接続後に送り直す
+                    continue
+            payload = None
+
+class Subscription:
+    def __init__(self, month: str, queue_size: int):
+        self.month = month
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=queue_size)
+        # 受信が追いつかずイベントを取りこぼした（クライアントは再取得が必要）
+        self.lagged = False
+
+    def offer(self, message: dict):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lagged = True
+            # 残りのイベントは捨て、再取得を促すイベントだけを届ける
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "month": self.month})
+
+class ScheduleEventHub:
+    """月ごとの購読者にスケジュールの変更イベントを配る
+
+    購読者ごとに上限付きのキューを1つ持つだけなので、待機中の接続はほぼコストがかからない
+    """
+
+    def __init__(self, backend: BroadcastBackend, queue_size: int = 100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def set_backend(self, backend: BroadcastBackend):
+        self.backend = backend
+
+    def publish_changes(self, items: Iterable[Tuple[int, date, Optional[str]]]):
+        """(user_id, work_date, location) の変更を月ごとにまとめて発行する（location が None は削除）"""
+        by_month: Dict[str, List[dict]] = defaultdict(list)
+        for user_id, work_date, location in items:
+            by_month[f"{work_date:%Y-%m}"].append(
+                {"user_id": user_id, "work_date": work_date.isoformat(), "location": location}
+            )
+        for month, changes in by_month.items():
+            self.backend.publish({"type": "changes", "month": month, "changes": changes})
+
+    def publish_resync(self, months: Iterable[str]):
+        """一括取り込みなど、セル単位で送らない変更（クライアントは月を再取得する）"""
+        for month in set(months):
+            self.backend.publish({"type": "resync", "month": month})
+
+    def _deliver(self, message: dict):
+        month = message.get("month")
+        if month is None:
+            # 配信経路の再接続など、取りこぼした月が分からない場合はすべての購読に再取得を促す
+            for month, subscribers in list(self._subscribers.items()):
+                for subscription in list(subscribers):
+                    subscription.offer({"type": "resync", "month": month})
+            return
+        for subscription in list(self._subscribers.get(month, ())):
+            subscription.offer(message)
+
+    @asynccontextmanager
+    async def subscribe(self, month: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(month, self.queue_size)
+        self._subscribers[month].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(month)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[month]
+
+    def stats(self) -> dict:
+        return {
+            "months": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+        }
+
+def _create_backend() -> BroadcastBackend:
+    if settings.live_updates_backend == "postgres":
+        from db import DATABASE_URL
+
+        return PostgresBroadcast(DATABASE_URL)
+    return LocalBroadcast()
+
+schedule_events = ScheduleEventHub(_create_backend(), queue_size=settings.live_updates_queue_size)
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+
+from models.data_version_model import DataVersion
+
+def build_etag(key: str, version: Optional[DataVersion], *variants) -> str:
+    number = version.version if version else 0
+    suffix = "".join(f"-{v}" for v in variants)
+    return f'W/"{key}-{number}{suffix}"'
+
+def cache_headers(etag: str, version: Optional[DataVersion]) -> Dict[str, str]:
+    # ブラウザにはキャッシュさせつつ、毎回 If-None-Match で再検証させる
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    last_modified: Optional[datetime] = version.updated_at if version else None
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # 弱い比較（W/ の有無は無視する）
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import time
+
+from abc import ABC, abstractmethod
+
+from config import settings
+from core.cache import token_cache
+
+logger = logging.getLogger(__name__)
+
+class TokenError(Exception):
+    """トークンが不正（署名不一致・期限切れ・形式不正）"""
+
+class JWTBackend(ABC):
+    """JWT の署名・検証を行うライブラリの差し替え口"""
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        ...
+
+    @abstractmethod
+    def decode(self, token: str) -> dict:
+        """署名と有効期限を検証してクレームを返す（不正な場合は TokenError）"""
+        ...
+
+class JoseBackend(JWTBackend):
+    """python-jose（既定）"""
+
+    def __init__(self, secret_key: str, algorithm: str):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+class PyJWTBackend(JWTBackend):
+    """PyJWT（python-jose より検証が速い）"""
+
+    def __init__(self, secret_key: str, algorithm: str):
+        import jwt
+
+        self._jwt = jwt
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except self._jwt.InvalidTokenError as e:
+            raise TokenError(str(e)) from e
+
+JWT_BACKENDS = {
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+}
+
+def create_backend(name: str) -> JWTBackend:
+    return JWT_BACKENDS[name](settings.secret_key, settings.algorithm)
+
+jwt_backend = create_backend(settings.jwt_backend)
+
+def _token_key(token: str) -> str:
+    # トークンそのものではなくダイジェストをキーにする（メモリ上に生のトークンを溜めない）
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def verify_token(token: str, use_cache: bool = True) -> dict:
+    """トークンを検証してクレームを返す（不正な場合は TokenError）
+
+    検証済みのトークンはダイジェストをキーにキャッシュし、同じトークンの2回目以降は署名検証を省く
+    キャッシュ済みでも exp を過ぎたものは使わない
+    """
+    if not use_cache:
+        return jwt_backend.decode(token)
+
+    key = _token_key(token)
+    claims = token_cache.get(key)
+    if claims is not None:
+        if claims.get("exp", 0) > time.time():
+            return claims
+        token_cache.delete(key)
+
+    claims = jwt_backend.decode(token)
+    token_cache.set(key, claims)
+    return claims
@@ -0,0 +1,45 @@
+import logging
+import threading
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class PoolMetrics:
+    """コネクションプールのチェックアウト待ち時間の集計"""
+
+    def __init__(self, slow_checkout_ms: float):
+        self.slow_checkout_ms = slow_checkout_ms
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record_checkout(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if wait_ms >= self.slow_checkout_ms:
+                self.slow_checkouts += 1
+        if timed_out:
+            logger.error(f"DB pool checkout timed out after {wait_ms:.1f}ms")
+        elif wait_ms >= self.slow_checkout_ms:
+            logger.warning(f"Slow DB pool checkout: waited {wait_ms:.1f}ms")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "avg_wait_ms": self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_ms,
+            }
+
+pool_metrics = PoolMetrics(slow_checkout_ms=settings.db_pool_slow_checkout_ms)
@@ -1,3 +1,92 @@
+import asyncio
+import logging
+import threading
+
+from concurrent.futures import Future, ProcessPoolExecutor
 from passlib.context import CryptContext
+from typing import Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# コストが設定値と異なるハッシュ（min_rounds 未満・max_rounds 超）は verify_and_update で再ハッシュ対象になる
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+class PasswordHasherBusy(Exception):
+    """ハッシュ処理の待ちが上限に達している"""
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _hash(plain_password: str) -> str:
+    return pwd_context.hash(plain_password)
+
+class PasswordHasher:
+    """bcrypt をプロセスプールで実行し、イベントループ・スレッドプール・GIL を占有しないようにする
+
+    実行中・待機中の件数が上限を超える場合は PasswordHasherBusy を送出する（呼び出し側で 503 を返す）
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # ワーカープロセスは初回利用時に起動する
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                logger.warning(f"Password hasher saturated: pending={self._pending}")
+                raise PasswordHasherBusy()
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._done()
+            raise
+        future.add_done_callback(lambda _: self._done())
+        return future
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def _run(self, fn, *args):
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """パスワードを検証し、コスト設定が変わっていれば新しいハッシュも返す"""
+        return await self._run(_verify_and_update, plain_password, hashed_password)
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run(_hash, plain_password)
+
+    def hash_blocking(self, plain_password: str) -> str:
+        """同期処理（スレッドプールで実行されるルート）から使う hash（完了まで呼び出し元のスレッドを待たせる）"""
+        return self._submit(_hash, plain_password).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending
+)
@@ -0,0 +1,371 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from core.cache import LocalLRUCache
+from core.jwt_backend import TokenError, verify_token
+
+logger = logging.getLogger(__name__)
+
+RATE_UNITS = {"second": 1, "minute": 60, "hour": 3600}
+
+def parse_rate(rate: str) -> Tuple[float, float]:
+    """'30/minute' 形式の制限を (1秒あたりの補充量, バケット容量) に変換する"""
+    count, _, unit = rate.partition("/")
+    if unit not in RATE_UNITS:
+        raise ValueError(f"Invalid rate limit: {rate}")
+    burst = float(count)
+    if burst <= 0:
+        raise ValueError(f"Invalid rate limit: {rate}")
+    return burst / RATE_UNITS[unit], burst
+
+@dataclass
+class RateLimitRule:
+    name: str
+    rate: float  # 1秒あたりの補充量
+    burst: float  # バケット容量（単位時間あたりの上限回数）
+    method: Optional[str] = None
+    path_prefix: str = ""
+
+    @classmethod
+    def from_setting(cls, name: str, rate: str, route: Optional[str] = None) -> "RateLimitRule":
+        per_second, burst = parse_rate(rate)
+        method, path_prefix = None, ""
+        if route:
+            # 'POST /api/auth/login' または '/api/imports'
+            method, _, path_prefix = route.partition(" ") if " " in route else (None, "", route)
+        return cls(name=name, rate=per_second, burst=burst, method=method, path_prefix=path_prefix)
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and path.startswith(self.path_prefix)
+
+class Bucket:
+    __slots__ = ("tokens", "updated", "rate", "burst", "pending")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.rate = rate
+        self.burst = burst
+        # 前回の同期以降にこのワーカーで消費した量
+        self.pending = 0.0
+
+    def wait(self, now: float) -> float:
+        """補充を反映し、1回分が足りない場合は補充されるまでの秒数を返す（消費はしない）"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """1回分を消費する（wait が 0 を返した後に呼ぶ）"""
+        self.tokens -= 1
+        self.pending += 1
+
+class RateLimitStore(ABC):
+    """ワーカー間で共有するバケットの保存先
+
+    各ワーカーはローカルのバケットで判定し、定期的に消費量を送って共有側の残量を受け取る
+    """
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def exchange(self, consumed: Dict[str, Tuple[float, float, float]]) -> Dict[str, float]:
+        """{key: (消費量, 補充量/秒, 容量)} を反映し、{key: 共有側の残量} を返す"""
+        ...
+
+class LocalRateLimitStore(RateLimitStore):
+    """プロセス内の共有バケット（単一ワーカー構成・テスト用）"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def exchange(self, consumed: Dict[str, Tuple[float, float, float]]) -> Dict[str, float]:
+        now = time.monotonic()
+        remaining = {}
+        for key, (count, rate, burst) in consumed.items():
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = max(min(burst, tokens + (now - updated) * rate) - count, -burst)
+            self._buckets[key] = (tokens, now)
+            remaining[key] = tokens
+        return remaining
+
+class PostgresRateLimitStore(RateLimitStore):
+    """PostgreSQL の UNLOGGED テーブル（rate_limit_buckets）で共有する（1回の同期で1文）"""
+
+    EXCHANGE_SQL = """
+    INSERT INTO rate_limit_buckets AS b (key, tokens, rate, burst, updated_at)
+    SELECT t.key, t.burst - t.consumed, t.rate, t.burst, now()
+    FROM unnest($1::text[], $2::float8[], $3::float8[], $4::float8[]) AS t(key, consumed, rate, burst)
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = greatest(
+            least(EXCLUDED.burst, b.tokens + extract(epoch FROM now() - b.updated_at) * EXCLUDED.rate)
+                - (EXCLUDED.burst - EXCLUDED.tokens),
+            -EXCLUDED.burst
+        ),
+        rate = EXCLUDED.rate,
+        burst = EXCLUDED.burst,
+        updated_at = now()
+    RETURNING key, tokens
+    """
+
+    # 一定時間使われていないバケットは削除する（満杯に戻っているため、なくても同じ）
+    CLEANUP_SQL = "DELETE FROM rate_limit_buckets WHERE updated_at < now() - interval '1 hour'"
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        self._exchanges = 0
+
+    async def start(self):
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+
+    async def stop(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def exchange(self, consumed: Dict[str, Tuple[float, float, float]]) -> Dict[str, float]:
+        if self._conn is None or self._conn.is_closed():
+            await self.start()
+        keys = list(consumed)
+        rows = await self._conn.fetch(
+            self.EXCHANGE_SQL,
+            keys,
+            [consumed[key][0] for key in keys],
+            [consumed[key][1] for key in keys],
+            [consumed[key][2] for key in keys],
+        )
+        self._exchanges += 1
+        if self._exchanges % 600 == 0:
+            await self._conn.execute(self.CLEANUP_SQL)
+        return {row["key"]: row["tokens"] for row in rows}
+
+class RateLimiter:
+    """トークンバケットによるレート制限
+
+    判定はワーカー内のバケットだけで行い（I/O なし）、消費量は sync_interval ごとに共有ストアと同期する
+    そのため同期間隔の間はワーカー数に応じて上限をわずかに超えることがある
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        default_rule: Optional[RateLimitRule],
+        user_rule: Optional[RateLimitRule],
+        route_rules: List[RateLimitRule],
+        sync_interval: float = 1.0,
+        max_buckets: int = 100000,
+    ):
+        self.store = store
+        self.default_rule = default_rule
+        self.user_rule = user_rule
+        # 長いパスのルールを優先する
+        self.route_rules = sorted(route_rules, key=lambda rule: len(rule.path_prefix), reverse=True)
+        self.sync_interval = sync_interval
+        self.max_buckets = max_buckets
+        self._buckets: Dict[str, Bucket] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self.rejected = 0
+
+    async def start(self):
+        try:
+            await self.store.start()
+        except Exception:
+            # 共有ストアに接続できなくても起動は続け、同期のたびに再接続する
+            logger.exception("Failed to connect to rate limit store")
+        self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        await self.store.stop()
+
+    def _bucket(self, key: str, rule: RateLimitRule, now: float) -> Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = Bucket(rule.rate, rule.burst, now)
+        return bucket
+
+    def _rules(self, method: str, path: str, user: Optional[str]) -> List[RateLimitRule]:
+        rules = []
+        for rule in self.route_rules:
+            if rule.matches(method, path):
+                rules.append(rule)
+                break
+        if user:
+            if self.user_rule is not None:
+                rules.append(self.user_rule)
+        elif self.default_rule is not None:
+            rules.append(self.default_rule)
+        return rules
+
+    def check(self, method: str, path: str, client: str, user: Optional[str]) -> float:
+        """リクエストを許可する場合は 0、拒否する場合は再試行までの秒数を返す
+
+        認証済みのリクエストはユーザごと、それ以外は IP アドレスごとに制限する
+        （同じ NAT の配下にいる社員どうしで IP アドレスの上限を共有しないようにする）
+        該当するすべてのバケット（ルートごと・全ルート共通）に残りがある場合だけ、それぞれから消費する
+        （拒否したリクエストでほかのバケットを減らさない）
+        """
+        now = time.monotonic()
+        identity = f"user:{user}" if user else f"ip:{client}"
+        rules = self._rules(method, path, user)
+        if not rules:
+            return 0.0
+
+        # バケットを作る前に整理する（この呼び出しで作ったバケットを整理で捨てないように）
+        if len(self._buckets) + len(rules) > self.max_buckets:
+            self._prune(now)
+        buckets = [self._bucket(f"{rule.name}:{identity}", rule, now) for rule in rules]
+        retry_after = max(bucket.wait(now) for bucket in buckets)
+        if retry_after:
+            return retry_after
+        for bucket in buckets:
+            bucket.take()
+        return 0.0
+
+    def _prune(self, now: float):
+        # 満杯まで補充されたバケット（しばらく使われていない）は作り直しても同じなので捨てる
+        for key in [
+            key for key, bucket in self._buckets.items()
+            if bucket.pending == 0 and bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst
+        ]:
+            del self._buckets[key]
+
+    async def sync(self):
+        consumed = {}
+        for key, bucket in self._buckets.items():
+            if bucket.pending:
+                consumed[key] = (bucket.pending, bucket.rate, bucket.burst)
+                bucket.pending = 0.0
+        if not consumed:
+            return
+
+        remaining = await self.store.exchange(consumed)
+        now = time.monotonic()
+        for key, tokens in remaining.items():
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                # 同期中にこのワーカーで消費した分を差し引く
+                bucket.tokens = min(bucket.burst, tokens - bucket.pending)
+                bucket.updated = now
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                # 共有ストアに接続できない間はワーカー内の判定だけで続ける
+                logger.exception("Failed to sync rate limit buckets")
+            if len(self._buckets) > self.max_buckets // 2:
+                self._prune(time.monotonic())
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "rejected": self.rejected}
+
+# 検証に失敗したトークンのダイジェスト（同じ不正なトークンを送り続けるクライアントで毎回署名検証しない）
+invalid_token_cache = LocalLRUCache(
+    max_entries=settings.rate_limit_invalid_token_max_entries,
+    ttl_seconds=settings.rate_limit_invalid_token_ttl_seconds
+)
+
+def _request_user(scope) -> Optional[str]:
+    # 認証の可否はここでは判定しない（検証済みトークンのキャッシュにより通常は署名検証なし）
+    token = None
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization" and value.startswith(b"Bearer "):
+            token = value[7:].decode("latin-1").strip()
+            break
+        if name == b"cookie" and token is None:
+            for part in value.decode("latin-1").split(";"):
+                key, _, cookie = part.strip().partition("=")
+                if key == "access_token":
+                    token = cookie
+    if not token:
+        return None
+
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    if invalid_token_cache.get(digest) is not None:
+        return None
+    try:
+        payload = verify_token(token)
+    except TokenError:
+        invalid_token_cache.set(digest, True)
+        return None
+    return payload.get("sub") if payload.get("type") == "access" else None
+
+class RateLimitMiddleware:
+    """pure ASGI のレート制限ミドルウェア（超過時は 429 と Retry-After を返す）"""
+
+    EXEMPT_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+    def __init__(self, app, limiter: "RateLimiter"):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        # プロキシ（nginx）経由の場合、uvicorn を --proxy-headers で起動し、FORWARDED_ALLOW_IPS に
+        # プロキシのアドレスを設定すること（設定しないと全員がプロキシの IP アドレスで数えられる）
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        retry_after = self.limiter.check(scope["method"], scope["path"], client, _request_user(scope))
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        self.limiter.rejected += 1
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, round(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def _create_store() -> RateLimitStore:
+    if settings.rate_limit_backend == "postgres":
+        from db import DATABASE_URL
+
+        return PostgresRateLimitStore(DATABASE_URL)
+    return LocalRateLimitStore()
+
+def _create_limiter() -> RateLimiter:
+    return RateLimiter(
+        store=_create_store(),
+        default_rule=RateLimitRule.from_setting("default", settings.rate_limit_default)
+        if settings.rate_limit_default else None,
+        user_rule=RateLimitRule.from_setting("user", settings.rate_limit_user)
+        if settings.rate_limit_user else None,
+        route_rules=[
+            RateLimitRule.from_setting(route, rate, route)
+            for route, rate in settings.rate_limit_routes.items()
+        ],
+        sync_interval=settings.rate_limit_sync_interval_seconds,
+    )
+
+rate_limiter = _create_limiter()
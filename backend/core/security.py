@@ -1,15 +1,20 @@
 import logging
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from fastapi import Request, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional, Union
 
 from config import settings
+from core.cache import principal_cache
+from core.jwt_backend import TokenError, jwt_backend, verify_token
+from crud import user_async as crud_user_async
 from crud.user import get_user_by_id
-from db import get_db
+from db import SessionLocal, get_async_db, get_db
 from models.user_model import User
 
 # ロガー設定
@@ -17,13 +22,37 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# サービストークンのスコープ
+MISSING_SCHEDULE_SCOPE = "missing-schedule"
+
+# 認証済みユーザの不変スナップショット（パスワードハッシュは保持しない）
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    employee_number: str
+    name: str
+    email: str
+    is_default_password: bool
+    commuting_allowance: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            employee_number=user.employee_number,
+            name=user.name,
+            email=user.email,
+            is_default_password=bool(user.is_default_password),
+            commuting_allowance=user.commuting_allowance,
+        )
+
 # トークン生成（共通）
 def create_token(data: dict, expires_delta: timedelta) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
 
-    token = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    token = jwt_backend.encode(to_encode)
     
     logger.debug(f"Token created for sub={data.get('sub')} with expiry={expire}")
     return token
@@ -34,21 +63,48 @@ def create_access_token(user_id: int) -> str:
         timedelta(minutes=settings.access_token_expire_minutes)
     )
 
-def create_refresh_token(user_id: int) -> str:
+# リフレッシュトークンはファミリー（ログイン単位）とトークンID を持ち、サーバ側でローテーションを管理する
+def create_refresh_token(user_id: int, family_id: str, token_id: str) -> str:
     return create_token(
-        {"sub": str(user_id), "type": "refresh"},
+        {"sub": str(user_id), "type": "refresh", "fam": family_id, "jti": token_id},
         timedelta(minutes=settings.refresh_token_expire_minutes)
     )
 
+def decode_refresh_token(token: str) -> Optional[dict]:
+    try:
+        # リフレッシュトークンは1回しか使われないため、キャッシュしない
+        payload = verify_token(token, use_cache=False)
+    except TokenError as e:
+        logger.warning(f"Failed to decode refresh token: {e}")
+        return None
+
+    if payload.get("type") != "refresh" or not all(payload.get(claim) for claim in ("sub", "fam", "jti")):
+        logger.warning(f"Rejected invalid refresh token: type={payload.get('type')}")
+        return None
+    return payload
+
+# サービス（Lambda 等）用の長期トークン：scopes に含まれる API だけを DB 参照なしで利用できる
+# settings.service_token_version を上げると、発行済みのトークンはすべて無効になる
+def create_service_token(name: str, scopes: List[str]) -> str:
+    return create_token(
+        {
+            "sub": f"service:{name}",
+            "type": "service",
+            "scopes": scopes,
+            "ver": settings.service_token_version,
+        },
+        timedelta(minutes=settings.service_token_expire_minutes)
+    )
+
 # トークン検証（直接使用されることは少ない）
 def decode_token(token: str) -> Optional[str]:
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = verify_token(token)
 
         logger.debug("Token decoded successfully")
         return payload.get("sub")
 
-    except JWTError as e:
+    except TokenError as e:
         logger.warning(f"Failed to decode token: {e}")
         return None
 
@@ -62,8 +118,8 @@ async def verify_csrf_token(request: Request):
     
     logger.debug("CSRF token verified successfully")
 
-# 認証付きルート用：現在のユーザーを取得
-async def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+# リクエストのトークン（Authorization ヘッダーまたは Cookie）を検証し、クレームを返す
+def decode_request_token(request: Request) -> dict:
 
     auth_header: Optional[str] = request.headers.get("Authorization")
     token: Optional[str] = None
@@ -84,24 +140,100 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)) -> U
         logger.warning("Missing access token in request cookies")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    # トークンをデコードして user_id を取り出す
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: str = payload.get("sub")
+        payload = verify_token(token)
+    except TokenError as e:
+        logger.warning(f"JWT decode error: {e}")
+        raise HTTPException(status_code=401, detail="Invalid token")
 
-        if user_id is None:
-            logger.warning("Access token is missing 'sub' claim")
-            raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("sub") is None:
+        logger.warning("Access token is missing 'sub' claim")
+        raise HTTPException(status_code=401, detail="Invalid token")
 
-    except JWTError as e:
-        logger.warning(f"JWT decode error: {e}")
+    return payload
+
+# リクエストのアクセストークンを検証し、user_id（sub）を取り出す
+def get_token_user_id(request: Request) -> str:
+    payload = decode_request_token(request)
+
+    # リフレッシュトークンやサービストークンはユーザ認証に使えない
+    if payload.get("type") != "access":
+        logger.warning(f"Rejected non-access token: type={payload.get('type')}")
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    # DB からユーザを取得
-    user = get_user_by_id(db, int(user_id))
-    if not user:
-        logger.warning(f"User not found: user_id={user_id}")
-        raise HTTPException(status_code=404, detail="User not found")
+    return payload["sub"]
+
+def _load_principal(db: Session, user_id: str) -> Principal:
+    # キャッシュになければ DB からユーザを取得
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = get_user_by_id(db, int(user_id))
+        if not user:
+            logger.warning(f"User not found: user_id={user_id}")
+            raise HTTPException(status_code=404, detail="User not found")
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+    return principal
+
+# 認証付きルート用：現在のユーザーを取得
+# ルーターとハンドラの両方で宣言されていても、FastAPI の依存関係キャッシュにより1リクエスト1回だけ解決される
+# 同期セッションで DB を参照するため、def にしてスレッドプールで実行させる（イベントループを止めない）
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> Principal:
+    principal = _load_principal(db, get_token_user_id(request))
+    logger.debug(f"Authenticated user: id={principal.id}, email={principal.email}")
+    return principal
+
+def _load_principal_with_new_session(user_id: str) -> Principal:
+    db = SessionLocal()
+    try:
+        return _load_principal(db, user_id)
+    finally:
+        db.close()
+
+# ストリーミング（SSE）ルート用：ユーザの取得に使ったセッションはすぐに閉じる
+# yield 依存関係（get_db）の後処理はレスポンスの終了まで遅れるため、長時間の接続で DB 接続を保持してしまう
+async def get_current_user_for_stream(request: Request) -> Principal:
+    user_id = get_token_user_id(request)
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = await run_in_threadpool(_load_principal_with_new_session, user_id)
+    logger.debug(f"Authenticated user: id={principal.id}, email={principal.email}")
+    return principal
+
+# 非同期セッション版（settings.db_async が有効な場合のルートで使用）
+async def get_current_user_async(request: Request, db: AsyncSession = Depends(get_async_db)) -> Principal:
+    user_id = get_token_user_id(request)
+
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await crud_user_async.get_user_by_id(db, int(user_id))
+        if not user:
+            logger.warning(f"User not found: user_id={user_id}")
+            raise HTTPException(status_code=404, detail="User not found")
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+
+    logger.debug(f"Authenticated user: id={principal.id}, email={principal.email}")
+    return principal
+
+# サービストークン（指定スコープ付き）または通常のユーザ認証のどちらかを要求する依存関数
+# サービストークンの場合は署名とクレームの検証のみで、DB は参照しない
+# ユーザの場合は同期セッションで DB を参照するため、def にしてスレッドプールで実行させる
+def require_scope(scope: str):
+    def dependency(request: Request, db: Session = Depends(get_db)) -> Union[str, Principal]:
+        payload = decode_request_token(request)
+        token_type = payload.get("type")
+
+        if token_type == "service":
+            if payload.get("ver") != settings.service_token_version or scope not in payload.get("scopes", []):
+                logger.warning(f"Service token rejected for scope={scope}: sub={payload['sub']}")
+                raise HTTPException(status_code=403, detail="Forbidden: insufficient scope")
+            logger.debug(f"Authenticated service: {payload['sub']} (scope={scope})")
+            return payload["sub"]
+
+        if token_type != "access":
+            logger.warning(f"Rejected non-access token: type={token_type}")
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return _load_principal(db, payload["sub"])
 
-    logger.debug(f"Authenticated user: id={user.id}, email={user.email}")
-    return user
\ No newline at end of file
+    return dependency
@@ -0,0 +1,44 @@
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+
+from models.data_version_model import DataVersion
+
+USERS_KEY = "users"
+
+def schedule_month_key(value: date) -> str:
+    return f"schedules:{value:%Y-%m}"
+
+def get_version(db: Session, key: str) -> Optional[DataVersion]:
+    return db.get(DataVersion, key)
+
+def get_combined_version(db: Session, keys: Iterable[str]) -> Optional[DataVersion]:
+    """複数キーのバージョンを1つにまとめる（範囲集計などの ETag 用）
+
+    バージョンは増加のみのため、合計値はいずれかのキーが更新されると必ず変わる
+    """
+    keys = sorted(set(keys))
+    total, updated_at = db.execute(
+        select(func.sum(DataVersion.version), func.max(DataVersion.updated_at))
+        .where(DataVersion.key.in_(keys))
+    ).one()
+    if total is None:
+        return None
+    # セッションには追加しない（ヘッダー組み立て用の一時オブジェクト）
+    return DataVersion(key=",".join(keys), version=total, updated_at=updated_at)
+
+def bump_statements(keys: Iterable[str]):
+    # 複数キーを更新する際のデッドロックを避けるため、常に同じ順序でロックする
+    for key in sorted(set(keys)):
+        stmt = pg_insert(DataVersion).values(key=key, version=1)
+        yield stmt.on_conflict_do_update(
+            index_elements=[DataVersion.key],
+            set_={"version": DataVersion.version + 1, "updated_at": func.now()}
+        )
+
+def bump_versions(db: Session, keys: Iterable[str]):
+    """指定したキーのバージョンを1つ進める（コミットは呼び出し側のトランザクションで行う）"""
+    for stmt in bump_statements(keys):
+        db.execute(stmt)
@@ -0,0 +1,13 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Optional
+
+from crud.data_version import bump_statements
+from models.data_version_model import DataVersion
+
+async def get_version(db: AsyncSession, key: str) -> Optional[DataVersion]:
+    return await db.get(DataVersion, key)
+
+async def bump_versions(db: AsyncSession, keys: Iterable[str]):
+    """指定したキーのバージョンを1つ進める（コミットは呼び出し側のトランザクションで行う）"""
+    for stmt in bump_statements(keys):
+        await db.execute(stmt)
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+
+from models.refresh_token_model import RefreshTokenFamily
+
+# ローテーションの結果
+ROTATED = "rotated"
+GRACE = "grace"  # 直前のトークンによる猶予期間内の同時リフレッシュ（新しいリフレッシュトークンは発行しない）
+REUSED = "reused"
+INVALID = "invalid"
+
+def create_family(db: Session, user_id: int, family_id: str, jti: str, expires_at: datetime):
+    # 期限切れのファミリーはログイン時にそのユーザの分だけ削除し、テーブルを小さく保つ
+    db.execute(
+        delete(RefreshTokenFamily).where(
+            RefreshTokenFamily.user_id == user_id,
+            RefreshTokenFamily.expires_at < func.now()
+        )
+    )
+    db.add(RefreshTokenFamily(family_id=family_id, user_id=user_id, current_jti=jti, expires_at=expires_at))
+    db.commit()
+
+def rotate_family(
+    db: Session, family_id: str, jti: str, new_jti: str, expires_at: datetime, grace: timedelta
+) -> Tuple[str, Optional[int]]:
+    """提示されたトークン（jti）が現在のものなら new_jti に差し替える
+
+    戻り値は (結果, user_id)。使用済みのトークンが再利用された場合はファミリーを無効にする
+    """
+    # 通常は1文で完了する（条件付き UPDATE なので同時リフレッシュでも成功するのは1つだけ）
+    user_id = db.execute(
+        update(RefreshTokenFamily)
+        .where(
+            RefreshTokenFamily.family_id == family_id,
+            RefreshTokenFamily.current_jti == jti,
+            RefreshTokenFamily.revoked_at.is_(None),
+            RefreshTokenFamily.expires_at > func.now(),
+        )
+        .values(previous_jti=jti, current_jti=new_jti, rotated_at=func.now(), expires_at=expires_at)
+        .returning(RefreshTokenFamily.user_id)
+    ).scalar_one_or_none()
+    if user_id is not None:
+        db.commit()
+        return ROTATED, user_id
+
+    family = db.get(RefreshTokenFamily, family_id)
+    if family is None or family.revoked_at is not None or family.expires_at <= datetime.now(family.expires_at.tzinfo):
+        db.rollback()
+        return INVALID, None
+
+    if (
+        family.previous_jti == jti
+        and family.rotated_at is not None
+        and family.rotated_at + grace > datetime.now(family.rotated_at.tzinfo)
+    ):
+        db.rollback()
+        return GRACE, family.user_id
+
+    family.revoked_at = func.now()
+    db.commit()
+    return REUSED, family.user_id
+
+def revoke_family(db: Session, family_id: str):
+    db.execute(
+        update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.family_id == family_id, RefreshTokenFamily.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
+    db.commit()
+
+def revoke_all_families_for_user(db: Session, user_id: int):
+    """ユーザのすべてのファミリーを無効にする（パスワード変更時。コミットは呼び出し側で行う）"""
+    db.execute(
+        update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.user_id == user_id, RefreshTokenFamily.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
@@ -1,29 +1,362 @@
-from datetime import date
+import calendar
+import json
+
+from datetime import date, timedelta
+from sqlalchemy import Integer, and_, any_, delete, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 
+from core.cache import schedule_cache
+from core.events import schedule_events
+from crud.data_version import bump_versions, schedule_month_key
+from crud.schedule_change import log_statement
 from models.schedule_model import WorkSchedule
+from models.user_model import User
+from utils.date_utils import month_range, parse_month
+
+# ---- 同期・非同期（crud/schedule_async.py）で共通の SQL 文と組み立て処理 ----
+
+def delete_statement(user_id: int, work_date: date):
+    # DELETE ... RETURNING で1回の往復で削除し、削除した行のIDを返す
+    return (
+        delete(WorkSchedule)
+        .where(WorkSchedule.user_id == user_id, WorkSchedule.work_date == work_date)
+        .returning(WorkSchedule.id)
+    )
+
+def upsert_statement(user_id: int, work_date: date, location: str):
+    # INSERT ... ON CONFLICT DO UPDATE ... RETURNING で登録・更新を1文で行う
+    return (
+        pg_insert(WorkSchedule)
+        .values(user_id=user_id, work_date=work_date, location=location)
+        .on_conflict_do_update(
+            constraint=WorkSchedule.UNIQUE_USER_DATE,
+            set_={"location": location}
+        )
+        .returning(WorkSchedule)
+        .execution_options(populate_existing=True)
+    )
+
+def range_statement(start: date, end: date, *columns):
+    # 文字列比較ではなく日付の範囲条件 [start, end) にして (work_date, user_id) インデックスを使わせる
+    return select(*columns).where(
+        WorkSchedule.work_date >= start,
+        WorkSchedule.work_date < end
+    )
+
+def month_statement(month: str, *columns):
+    return range_statement(*month_range(month), *columns)
+
+def grid_statement(month: str):
+    return month_statement(
+        month, WorkSchedule.user_id, WorkSchedule.work_date, WorkSchedule.location
+    ).order_by(WorkSchedule.user_id)
+
+def list_statement(month: str):
+    return month_statement(
+        month, WorkSchedule.id, WorkSchedule.user_id, WorkSchedule.work_date, WorkSchedule.location
+    )
+
+def build_grid(month: str, rows) -> dict:
+    """(user_id, work_date, location) の行から「日付 × ユーザ」のグリッドを組み立てる
+
+    作業場所は辞書（locations）のインデックスで表す
+    """
+    first_day, next_first_day = month_range(month)
+    days = (next_first_day - first_day).days
+
+    locations: List[str] = []
+    location_index: Dict[str, int] = {}
+    users: Dict[int, List[Optional[int]]] = {}
+    for user_id, work_date, location in rows:
+        index = location_index.get(location)
+        if index is None:
+            index = location_index[location] = len(locations)
+            locations.append(location)
+        cells = users.get(user_id)
+        if cells is None:
+            cells = users[user_id] = [None] * days
+        cells[work_date.day - 1] = index
+
+    return {
+        "month": month,
+        "dates": [first_day.replace(day=day).isoformat() for day in range(1, days + 1)],
+        "locations": locations,
+        "users": users,
+    }
+
+def build_list(rows) -> List[dict]:
+    return [
+        {
+            "id": schedule_id,
+            "user_id": user_id,
+            "work_date": work_date.isoformat(),
+            "location": location,
+        }
+        for schedule_id, user_id, work_date, location in rows
+    ]
+
+def summary_statement(start: date, end: date):
+    # 期間内にスケジュールのないユーザも 0 件で返すため、ユーザを起点に外部結合する
+    return (
+        select(
+            User.id, User.employee_number, User.name, User.commuting_allowance,
+            WorkSchedule.location, func.count(WorkSchedule.id).label("days")
+        )
+        .outerjoin(
+            WorkSchedule,
+            and_(
+                WorkSchedule.user_id == User.id,
+                WorkSchedule.work_date >= start,
+                WorkSchedule.work_date < end,
+            )
+        )
+        .group_by(User.id, WorkSchedule.location)
+        .order_by(User.id)
+    )
+
+def build_summary(start: date, end: date, rows) -> dict:
+    """(ユーザ, 作業場所, 日数) の集計行をユーザごとの作業場所別日数にまとめる"""
+    locations = set()
+    users: Dict[int, dict] = {}
+    for row in rows:
+        user = users.get(row.id)
+        if user is None:
+            user = users[row.id] = {
+                "user_id": row.id,
+                "employee_number": row.employee_number,
+                "name": row.name,
+                "commuting_allowance": row.commuting_allowance,
+                "total_days": 0,
+                "counts": {},
+            }
+        if row.location is not None:
+            locations.add(row.location)
+            user["counts"][row.location] = row.days
+            user["total_days"] += row.days
+
+    return {
+        "start_date": start,
+        "end_date": end - timedelta(days=1),
+        "locations": sorted(locations),
+        "users": list(users.values()),
+    }
+
+def export_statement(start: date, end: date):
+    # ユーザごとにまとめて読むため (ユーザ, 日付) 順。スケジュールのないユーザも空行で出力する
+    return (
+        select(User.id, User.employee_number, User.name, WorkSchedule.work_date, WorkSchedule.location)
+        .outerjoin(
+            WorkSchedule,
+            and_(
+                WorkSchedule.user_id == User.id,
+                WorkSchedule.work_date >= start,
+                WorkSchedule.work_date < end,
+            )
+        )
+        .order_by(User.id, WorkSchedule.work_date)
+    )
+
+def dump_payload(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def normalize_bulk_items(items: Iterable[Tuple[int, date, Optional[str]]]) -> Dict[Tuple[int, date], Optional[str]]:
+    # 空文字は削除（None）として扱い、同じユーザ・日付は後の項目を優先する
+    latest: Dict[Tuple[int, date], Optional[str]] = {}
+    for user_id, work_date, location in items:
+        if location is not None and location.strip() == "":
+            location = None
+        latest[(user_id, work_date)] = location
+    return latest
+
+class UnknownUsers(Exception):
+    """登録対象に存在しないユーザIDが含まれている（呼び出し側で 422 を返す）"""
+
+    def __init__(self, user_ids: Iterable[int]):
+        self.user_ids = sorted(user_ids)
+        super().__init__(f"Unknown user_id: {self.user_ids}")
+
+def upsert_user_ids(latest: Dict[Tuple[int, date], Optional[str]]) -> List[int]:
+    # 削除だけの項目は存在しないユーザでも何もしないため、確認するのは登録・更新の対象だけ
+    return sorted({user_id for (user_id, _), location in latest.items() if location is not None})
+
+def existing_users_statement(user_ids: List[int]):
+    # 確認したユーザがコミットまでに削除されないよう FOR KEY SHARE でロックする
+    return (
+        select(User.id)
+        .where(User.id == any_(literal(user_ids, ARRAY(Integer))))
+        .with_for_update(key_share=True)
+    )
+
+def check_users(user_ids: List[int], existing: Iterable[int]):
+    missing = set(user_ids) - set(existing)
+    if missing:
+        raise UnknownUsers(missing)
+
+def bulk_upsert_statement(latest: Dict[Tuple[int, date], Optional[str]]):
+    upserts = [
+        {"user_id": user_id, "work_date": work_date, "location": location}
+        for (user_id, work_date), location in latest.items() if location is not None
+    ]
+    if not upserts:
+        return None
+    stmt = pg_insert(WorkSchedule).values(upserts)
+    return stmt.on_conflict_do_update(
+        constraint=WorkSchedule.UNIQUE_USER_DATE,
+        set_={"location": stmt.excluded.location}
+    ).returning(WorkSchedule.id, WorkSchedule.user_id, WorkSchedule.work_date)
+
+def bulk_delete_statement(latest: Dict[Tuple[int, date], Optional[str]]):
+    deletes = [key for key, location in latest.items() if location is None]
+    if not deletes:
+        return None
+    return delete(WorkSchedule).where(tuple_(WorkSchedule.user_id, WorkSchedule.work_date).in_(deletes))
+
+def bulk_results(latest: Dict[Tuple[int, date], Optional[str]], saved_ids: Dict[Tuple[int, date], int]) -> List[dict]:
+    return [
+        {
+            "id": saved_ids.get(key),
+            "user_id": key[0],
+            "work_date": key[1],
+            "location": location,
+            "status": "deleted" if location is None else "saved",
+        }
+        for key, location in latest.items()
+    ]
+
+def change_items(latest: Dict[Tuple[int, date], Optional[str]]) -> List[Tuple[int, date, Optional[str]]]:
+    return [(user_id, work_date, location) for (user_id, work_date), location in latest.items()]
+
+def copy_source_statement(user_id: int, source_month: str):
+    return month_statement(source_month, WorkSchedule.work_date, WorkSchedule.location).where(
+        WorkSchedule.user_id == user_id
+    )
+
+def copy_items(user_id: int, rows, target_month: str) -> List[Tuple[int, date, str]]:
+    # コピー先の月に存在しない日（例: 31日 → 30日までの月）はスキップする
+    target_first = parse_month(target_month)
+    last_day = calendar.monthrange(target_first.year, target_first.month)[1]
+    return [
+        (user_id, target_first.replace(day=work_date.day), location)
+        for work_date, location in rows if work_date.day <= last_day
+    ]
+
+def invalidate_months(work_dates: Iterable[date]):
+    for month in {f"{work_date:%Y-%m}" for work_date in work_dates}:
+        schedule_cache.invalidate(month)
+
+def changes_committed(changes: List[Tuple[int, date, Optional[str]]]):
+    """コミット後の共通処理（同期版・非同期版）：対象月のレスポンスキャッシュを破棄し、変更を通知する"""
+    if not changes:
+        return
+    invalidate_months(work_date for _, work_date, _ in changes)
+    schedule_events.publish_changes(changes)
+
+# ---- 同期版 CRUD ----
 
 def get_schedule(db: Session, user_id: int, work_date: date) -> Optional[WorkSchedule]:
     return db.query(WorkSchedule).filter_by(user_id=user_id, work_date=work_date).first()
 
-def delete_schedule(db: Session, schedule: WorkSchedule):
-    db.delete(schedule)
+def delete_schedule(db: Session, user_id: int, work_date: date) -> Optional[int]:
+    deleted_id = db.execute(delete_statement(user_id, work_date)).scalar_one_or_none()
+    if deleted_id is not None:
+        bump_versions(db, [schedule_month_key(work_date)])
+        db.execute(log_statement([(user_id, work_date, None)]))
     db.commit()
+    if deleted_id is not None:
+        changes_committed([(user_id, work_date, None)])
+    return deleted_id
 
 def save_schedule(db: Session, user_id: int, work_date: date, location: str) -> WorkSchedule:
-    schedule = get_schedule(db, user_id, work_date)
-    if schedule:
-        schedule.location = location
-    else:
-        schedule = WorkSchedule(user_id=user_id, work_date=work_date, location=location)
-        db.add(schedule)
+    schedule = db.scalars(upsert_statement(user_id, work_date, location)).one()
+    bump_versions(db, [schedule_month_key(work_date)])
+    db.execute(log_statement([(user_id, work_date, location)]))
     db.commit()
-    db.refresh(schedule)
+    changes_committed([(user_id, work_date, location)])
     return schedule
 
 def get_schedules_by_month(db: Session, month: Optional[str]) -> List[WorkSchedule]:
-    query = db.query(WorkSchedule)
     if month:
-        query = query.filter(WorkSchedule.work_date.like(f"{month}-%"))
-    return query.all()
+        return list(db.scalars(month_statement(month, WorkSchedule)))
+    return db.query(WorkSchedule).all()
+
+def get_schedule_grid(db: Session, month: str) -> dict:
+    """対象月のスケジュールをグリッド形式で返す（ORM オブジェクトを生成せず列だけを取得する）"""
+    return build_grid(month, db.execute(grid_statement(month)))
+
+def get_month_payload(db: Session, month: str, fmt: str) -> bytes:
+    """対象月のスケジュールを指定形式（list / grid）の JSON バイト列にシリアライズする"""
+    if fmt == "grid":
+        return dump_payload(get_schedule_grid(db, month))
+    return dump_payload(build_list(db.execute(list_statement(month))))
+
+def bulk_apply_schedules(db: Session, items: Iterable[Tuple[int, date, Optional[str]]]) -> List[dict]:
+    """(user_id, work_date, location) の一覧を1トランザクションでまとめて反映する
+
+    location が空または None の項目は削除、それ以外は複数行 upsert で登録・更新する
+    同じユーザ・日付が複数回含まれる場合は後の項目が優先される
+    登録・更新の対象に存在しないユーザが含まれる場合は何も反映せず UnknownUsers を送出する
+    """
+    latest = normalize_bulk_items(items)
+
+    saved_ids: Dict[Tuple[int, date], int] = {}
+    try:
+        user_ids = upsert_user_ids(latest)
+        if user_ids:
+            check_users(user_ids, db.scalars(existing_users_statement(user_ids)))
+
+        upsert_stmt = bulk_upsert_statement(latest)
+        if upsert_stmt is not None:
+            for row in db.execute(upsert_stmt):
+                saved_ids[(row.user_id, row.work_date)] = row.id
+
+        delete_stmt = bulk_delete_statement(latest)
+        if delete_stmt is not None:
+            db.execute(delete_stmt)
+
+        if latest:
+            bump_versions(db, (schedule_month_key(work_date) for _, work_date in latest))
+            db.execute(log_statement(change_items(latest)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    changes_committed(change_items(latest))
+    return bulk_results(latest, saved_ids)
+
+def get_location_summary(db: Session, start: date, end: date) -> dict:
+    """[start, end) のユーザごとの作業場所別日数を DB の GROUP BY で集計する"""
+    return build_summary(start, end, db.execute(summary_statement(start, end)))
+
+def iter_export_rows(db: Session, start: date, end: date, batch_size: int = 1000) -> Iterator[List[str]]:
+    """[start, end) のスケジュールを「ユーザ × 日付」の表として1行ずつ返す（先頭行は見出し）
+
+    サーバサイドカーソルで少しずつ読み、1ユーザ分ずつ組み立てるため、期間の長さによらずメモリ使用量は一定
+    """
+    days = (end - start).days
+    yield ["社員番号", "氏名"] + [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+    current_id = None
+    row: List[str] = []
+    stmt = export_statement(start, end).execution_options(yield_per=batch_size)
+    for user_id, employee_number, name, work_date, location in db.execute(stmt):
+        if user_id != current_id:
+            if current_id is not None:
+                yield row
+            current_id = user_id
+            row = [employee_number, name] + [""] * days
+        if work_date is not None:
+            row[2 + (work_date - start).days] = location
+    if current_id is not None:
+        yield row
+
+def copy_month_schedules(db: Session, user_id: int, source_month: str, target_month: str) -> List[dict]:
+    """指定ユーザのコピー元の月のスケジュールを、同じ日付でコピー先の月に登録・更新する"""
+    rows = db.execute(copy_source_statement(user_id, source_month))
+    items = copy_items(user_id, rows, target_month)
+    if not items:
+        return []
+    return bulk_apply_schedules(db, items)
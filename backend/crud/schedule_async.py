@@ -0,0 +1,89 @@
+# crud/schedule.py の非同期版（SQL 文と組み立て処理は同期版と共通）
+
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, Optional, List, Tuple
+
+from crud.data_version import schedule_month_key
+from crud.data_version_async import bump_versions
+from crud.schedule_change import log_statement
+from crud.schedule import (
+    build_grid,
+    build_list,
+    bulk_delete_statement,
+    bulk_results,
+    bulk_upsert_statement,
+    change_items,
+    changes_committed,
+    check_users,
+    copy_items,
+    copy_source_statement,
+    delete_statement,
+    dump_payload,
+    existing_users_statement,
+    grid_statement,
+    list_statement,
+    normalize_bulk_items,
+    upsert_statement,
+    upsert_user_ids,
+)
+from models.schedule_model import WorkSchedule
+
+async def delete_schedule(db: AsyncSession, user_id: int, work_date: date) -> Optional[int]:
+    deleted_id = (await db.execute(delete_statement(user_id, work_date))).scalar_one_or_none()
+    if deleted_id is not None:
+        await bump_versions(db, [schedule_month_key(work_date)])
+        await db.execute(log_statement([(user_id, work_date, None)]))
+    await db.commit()
+    if deleted_id is not None:
+        changes_committed([(user_id, work_date, None)])
+    return deleted_id
+
+async def save_schedule(db: AsyncSession, user_id: int, work_date: date, location: str) -> WorkSchedule:
+    schedule = (await db.scalars(upsert_statement(user_id, work_date, location))).one()
+    await bump_versions(db, [schedule_month_key(work_date)])
+    await db.execute(log_statement([(user_id, work_date, location)]))
+    await db.commit()
+    changes_committed([(user_id, work_date, location)])
+    return schedule
+
+async def get_month_payload(db: AsyncSession, month: str, fmt: str) -> bytes:
+    if fmt == "grid":
+        return dump_payload(build_grid(month, await db.execute(grid_statement(month))))
+    return dump_payload(build_list(await db.execute(list_statement(month))))
+
+async def bulk_apply_schedules(db: AsyncSession, items: Iterable[Tuple[int, date, Optional[str]]]) -> List[dict]:
+    latest = normalize_bulk_items(items)
+
+    saved_ids: Dict[Tuple[int, date], int] = {}
+    try:
+        user_ids = upsert_user_ids(latest)
+        if user_ids:
+            check_users(user_ids, await db.scalars(existing_users_statement(user_ids)))
+
+        upsert_stmt = bulk_upsert_statement(latest)
+        if upsert_stmt is not None:
+            for row in await db.execute(upsert_stmt):
+                saved_ids[(row.user_id, row.work_date)] = row.id
+
+        delete_stmt = bulk_delete_statement(latest)
+        if delete_stmt is not None:
+            await db.execute(delete_stmt)
+
+        if latest:
+            await bump_versions(db, (schedule_month_key(work_date) for _, work_date in latest))
+            await db.execute(log_statement(change_items(latest)))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    changes_committed(change_items(latest))
+    return bulk_results(latest, saved_ids)
+
+async def copy_month_schedules(db: AsyncSession, user_id: int, source_month: str, target_month: str) -> List[dict]:
+    rows = await db.execute(copy_source_statement(user_id, source_month))
+    items = copy_items(user_id, rows, target_month)
+    if not items:
+        return []
+    return await bulk_apply_schedules(db, items)
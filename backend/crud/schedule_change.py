@@ -0,0 +1,112 @@
+from datetime import date, datetime
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional, Tuple
+
+from crud.data_version import get_version
+from models.data_version_model import DataVersion
+from models.schedule_change_model import ScheduleChange
+from utils.date_utils import month_range
+
+# コンパクションで削除した最大の id（これより前のカーソルからは差分を作れない）
+COMPACTED_KEY = "schedule_changes:compacted"
+
+def log_statement(items: Iterable[Tuple[int, date, Optional[str]]]):
+    """(user_id, work_date, location) の変更履歴を追記する文（location が None は削除）
+
+    月のバージョンを更新した後（＝月の行ロックを取得した後）に実行すること
+    同じ月への書き込みはそのロックで直列化されるため、月内では id 順とコミット順が一致する
+    """
+    rows = [
+        {"user_id": user_id, "work_date": work_date, "location": location}
+        for user_id, work_date, location in items
+    ]
+    if not rows:
+        return None
+    return insert(ScheduleChange).values(rows)
+
+def changes_statement(month: str, since: int, limit: int):
+    first_day, next_first_day = month_range(month)
+    return (
+        select(ScheduleChange.id, ScheduleChange.user_id, ScheduleChange.work_date, ScheduleChange.location)
+        .where(
+            ScheduleChange.id > since,
+            ScheduleChange.work_date >= first_day,
+            ScheduleChange.work_date < next_first_day,
+        )
+        .order_by(ScheduleChange.id)
+        .limit(limit + 1)
+    )
+
+def build_changes(month: str, since: int, rows, limit: int) -> dict:
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # 同じセルの変更は最後のものだけを返す
+    latest: Dict[Tuple[int, date], Optional[str]] = {}
+    for _, user_id, work_date, location in rows:
+        latest.pop((user_id, work_date), None)
+        latest[(user_id, work_date)] = location
+
+    return {
+        "month": month,
+        "reset": False,
+        "cursor": rows[-1].id if rows else since,
+        "has_more": has_more,
+        "changes": [
+            {"user_id": user_id, "work_date": work_date, "location": location}
+            for (user_id, work_date), location in latest.items()
+        ],
+    }
+
+def get_month_cursor(db: Session, month: str, floor: int = 0) -> int:
+    """対象月の変更の最大 id（月の初回取得・取り直し時のカーソル）
+
+    全体の最大 id は使わない。id の順序とコミット順が一致するのは月内だけなので、
+    別の月の後発の id を返すと、対象月で未コミットの小さい id の変更を取りこぼす
+    """
+    first_day, next_first_day = month_range(month)
+    latest = db.execute(
+        select(func.max(ScheduleChange.id)).where(
+            ScheduleChange.work_date >= first_day,
+            ScheduleChange.work_date < next_first_day,
+        )
+    ).scalar_one()
+    return max(latest or 0, floor)
+
+def get_changes(db: Session, month: str, since: Optional[int], limit: int = 1000) -> dict:
+    """カーソル以降の対象月の変更を返す
+
+    since を省略した場合は現在のカーソルだけを返す（クライアントはその後に月全体を取得する）
+    カーソルが削除済みの履歴を指す場合は reset=True を返す（月全体を取得し直す必要がある）
+    """
+    if since is None:
+        return {"month": month, "reset": False, "cursor": get_month_cursor(db, month), "has_more": False, "changes": []}
+
+    compacted = get_version(db, COMPACTED_KEY)
+    if compacted is not None and since < compacted.version:
+        # 削除済みの範囲より前には戻らないようにする（戻ると次の取得でも reset になり続ける）
+        cursor = get_month_cursor(db, month, floor=compacted.version)
+        return {"month": month, "reset": True, "cursor": cursor, "has_more": False, "changes": []}
+
+    return build_changes(month, since, db.execute(changes_statement(month, since, limit)), limit)
+
+def compact_changes(db: Session, before: datetime) -> int:
+    """before より前の変更履歴を削除し、削除した件数を返す"""
+    deleted = (
+        delete(ScheduleChange)
+        .where(ScheduleChange.changed_at < before)
+        .returning(ScheduleChange.id)
+        .cte("deleted")
+    )
+    count, max_id = db.execute(select(func.count(), func.max(deleted.c.id)).select_from(deleted)).one()
+    if max_id is not None:
+        stmt = pg_insert(DataVersion).values(key=COMPACTED_KEY, version=max_id)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DataVersion.key],
+            set_={"version": func.greatest(DataVersion.version, stmt.excluded.version), "updated_at": func.now()}
+        ))
+    db.commit()
+    return count
@@ -1,14 +1,19 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, and_, not_, exists
-from typing import Optional
+from datetime import date
+from sqlalchemy import and_, exists, func, not_, select
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from core.cache import principal_cache
+from crud.data_version import USERS_KEY, bump_versions
+from crud.refresh_token import revoke_all_families_for_user
 from models.user_model import User
 from models.schedule_model import WorkSchedule
-from core.password_utils import pwd_context
+from utils.date_utils import business_days, month_range_of
 
 def create_user(db: Session, name: str) -> User:
     user = User(name=name)
     db.add(user)
+    bump_versions(db, [USERS_KEY])
     db.commit()
     db.refresh(user)
     return user
@@ -16,15 +21,18 @@ def create_user(db: Session, name: str) -> User:
 def get_all_users(db: Session):
     return db.query(User).all()
 
-def get_all_users(db: Session, current_user_id: Optional[int] = None):
-    query = db.query(User)
+def all_users_statement(current_user_id: Optional[int] = None):
+    stmt = select(User)
     if current_user_id is not None:
         # CASE文でログイン中のユーザーを先頭にする
-        query = query.order_by(
+        stmt = stmt.order_by(
             (User.id != current_user_id).asc(),  # ログイン中ユーザー（False=0）が先頭になる
             User.id.asc()  # それ以外はID順
         )
-    return query.all()
+    return stmt
+
+def get_all_users(db: Session, current_user_id: Optional[int] = None):
+    return list(db.scalars(all_users_statement(current_user_id)))
 
 def get_user_by_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
@@ -32,27 +40,119 @@ def get_user_by_id(db: Session, user_id: int):
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
-# 対象月の勤務データが「未登録」のユーザー抽出
-def get_users_missing_schedule(db: Session, year: int, month: int):
-    users = db.query(User).filter(
+# 射影（fields 指定）で取得できる列
+USER_FIELDS = {
+    "id": User.id,
+    "employee_number": User.employee_number,
+    "name": User.name,
+    "email": User.email,
+    "commuting_allowance": User.commuting_allowance,
+    "is_default_password": User.is_default_password,
+}
+
+def missing_schedule_statement(year: int, month: int, *columns):
+    # 日付の範囲条件にした NOT EXISTS（アンチジョイン）で (work_date, user_id) インデックスを使わせる
+    first_day, next_first_day = month_range_of(year, month)
+    return select(*columns).where(
         not_(
             exists().where(
                 and_(
                     WorkSchedule.user_id == User.id,
-                    extract('year', WorkSchedule.work_date) == year,
-                    extract('month', WorkSchedule.work_date) == month,
+                    WorkSchedule.work_date >= first_day,
+                    WorkSchedule.work_date < next_first_day,
                 )
             )
         )
-    ).all()
-    return users
+    )
+
+# 対象月の勤務データが「未登録」のユーザー抽出
+def get_users_missing_schedule(db: Session, year: int, month: int):
+    return list(db.scalars(missing_schedule_statement(year, month, User)))
+
+def _projected_statement(year: int, month: int, fields: List[str]):
+    # カーソル用に id は常に取得する
+    columns = [User.id.label("_cursor")] + [USER_FIELDS[field].label(field) for field in fields]
+    return missing_schedule_statement(year, month, *columns).order_by(User.id)
+
+def get_users_missing_schedule_page(
+    db: Session, year: int, month: int, fields: List[str], after_id: Optional[int], limit: int
+) -> Tuple[List[dict], Optional[int]]:
+    """未登録ユーザを id 順のキーセットページングで取得する（指定列のみ）
+
+    戻り値は (ページ, 次ページのカーソル)。最終ページの場合カーソルは None
+    """
+    stmt = _projected_statement(year, month, fields)
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    rows = db.execute(stmt.limit(limit)).all()
+
+    page = [{field: row._mapping[field] for field in fields} for row in rows]
+    next_cursor = rows[-1]._cursor if len(rows) == limit else None
+    return page, next_cursor
+
+def iter_users_missing_schedule(
+    db: Session, year: int, month: int, fields: List[str], batch_size: int = 500
+) -> Iterator[dict]:
+    """未登録ユーザをサーバサイドカーソルで少しずつ取得する（メモリ使用量を一定に保つ）"""
+    stmt = _projected_statement(year, month, fields).execution_options(yield_per=batch_size)
+    for row in db.execute(stmt):
+        yield {field: row._mapping[field] for field in fields}
+
+# 対象月の営業日に対する登録状況（未登録・一部未登録・登録済み）をユーザごとに集計
+def get_schedule_coverage(db: Session, year: int, month: int, holidays: Iterable[date] = ()) -> List[dict]:
+    first_day, next_first_day = month_range_of(year, month)
+    expected_days = business_days(first_day, next_first_day, holidays)
+    expected = len(expected_days)
+
+    registered = func.count(WorkSchedule.id)
+    if expected_days:
+        registered = registered.filter(WorkSchedule.work_date.in_(expected_days))
+    stmt = (
+        select(User.id, User.name, User.email, registered.label("registered"))
+        .outerjoin(
+            WorkSchedule,
+            and_(
+                WorkSchedule.user_id == User.id,
+                WorkSchedule.work_date >= first_day,
+                WorkSchedule.work_date < next_first_day,
+            )
+        )
+        .group_by(User.id)
+        .order_by(User.id)
+    )
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    coverage = []
+    for row in db.execute(stmt):
+        registered_days = row.registered if expected else 0
+        if registered_days >= expected:
+            status = "complete"
+        elif registered_days == 0:
+            status = "missing"
+        else:
+            status = "partial"
+        coverage.append({
+            "user_id": row.id,
+            "name": row.name,
+            "email": row.email,
+            "registered_business_days": registered_days,
+            "expected_business_days": expected,
+            "missing_business_days": expected - registered_days,
+            "status": status,
+        })
+    return coverage
 
-def update_user_password(db: Session, user: User, new_password: str):
-    user.hashed_password = pwd_context.hash(new_password)
+def update_user_password(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
     user.is_default_password = False
+    # 盗まれたリフレッシュトークンを使い続けられないよう、同じトランザクションで全ログインを無効にする
+    revoke_all_families_for_user(db, user.id)
+    bump_versions(db, [USERS_KEY])
+    db.commit()
+    principal_cache.delete(str(user.id))
+
+# コスト設定変更に伴う再ハッシュ（ユーザから見た状態は変わらない）
+def rehash_user_password(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
     db.commit()
 
 def update_commuting_allowance(db: Session, user_id: int, allowance: str):
@@ -60,6 +160,8 @@ def update_commuting_allowance(db: Session, user_id: int, allowance: str):
     if not user:
         return None
     user.commuting_allowance = allowance
+    bump_versions(db, [USERS_KEY])
     db.commit()
+    principal_cache.delete(str(user.id))
     db.refresh(user)
     return user
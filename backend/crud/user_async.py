@@ -0,0 +1,26 @@
+# crud/user.py の非同期版（一覧取得など負荷の高い処理のみ）
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from core.cache import principal_cache
+from crud.data_version import USERS_KEY
+from crud.data_version_async import bump_versions
+from crud.user import all_users_statement
+from models.user_model import User
+
+async def get_all_users(db: AsyncSession, current_user_id: Optional[int] = None):
+    return list(await db.scalars(all_users_statement(current_user_id)))
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.get(User, user_id)
+
+async def update_commuting_allowance(db: AsyncSession, user_id: int, allowance: str):
+    user = await get_user_by_id(db, user_id)
+    if not user:
+        return None
+    user.commuting_allowance = allowance
+    await bump_versions(db, [USERS_KEY])
+    await db.commit()
+    principal_cache.delete(str(user.id))
+    return user
@@ -1,21 +1,151 @@
+import threading
+import time
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlalchemy import create_engine
+from typing import Optional
+
 from config import settings
+from core.metrics import pool_metrics
 
 DATABASE_URL = (
     f"postgresql://{settings.postgres_user}:{settings.postgres_password}"
     f"@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}"
 )
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+class _CheckoutTimingMixin:
+    """プールからのチェックアウト待ち時間を pool_metrics に記録する"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_checkout((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        pool_metrics.record_checkout((time.perf_counter() - start) * 1000)
+        return conn
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _engine_options(pool_class, is_async: bool) -> dict:
+    connect_args = {}
+    if settings.db_statement_timeout_ms > 0:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    if settings.db_external_pooler:
+        # PgBouncer などの外部プーラー利用時はアプリ側でプールしない
+        if is_async:
+            # トランザクションプーリングではプリペアドステートメントを使い回せない
+            connect_args["statement_cache_size"] = 0
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    return {
+        "poolclass": pool_class,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+# エンジンは初回利用時に作成する（ワーカー起動・テスト時の import を軽くするため）
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(DATABASE_URL, **_engine_options(InstrumentedQueuePool, is_async=False))
+    return _engine
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(
+                    ASYNC_DATABASE_URL, **_engine_options(InstrumentedAsyncQueuePool, is_async=True)
+                )
+    return _async_engine
+
+class _LazyBindSession(Session):
+    """セッションの利用時に（必要なら）エンジンを作成して接続する"""
+
+    def get_bind(self, *args, **kwargs):
+        return get_engine()
+
+class _LazyAsyncBindSession(Session):
+    def get_bind(self, *args, **kwargs):
+        return get_async_engine().sync_engine
+
+SessionLocal = sessionmaker(class_=_LazyBindSession, autocommit=False, autoflush=False)
+
+# 非同期セッション（settings.db_async が有効な場合に使用）
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=_LazyAsyncBindSession, autoflush=False, expire_on_commit=False
+)
+
+def dispose_engines():
+    """作成済みのエンジンの接続を閉じる（アプリ終了時）"""
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
 
 Base = declarative_base()
 
+def pool_status() -> dict:
+    """プールの使用状況（飽和度）とチェックアウト待ち時間を返す"""
+    status = {"external_pooler": settings.db_external_pooler, **pool_metrics.snapshot()}
+    pools = {}
+    if _engine is not None:
+        pools["sync"] = _engine.pool
+    if _async_engine is not None:
+        pools["async"] = _async_engine.pool
+    for name, pool in pools.items():
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + settings.db_max_overflow
+            status[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "capacity": capacity,
+                "saturation": pool.checkedout() / capacity if capacity else 0.0,
+            }
+    return status
+
+# セッション依存関係（すべてのルーターでこれを使う）
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,31 @@
+"""CSV の一括取り込み（コマンドライン）
+
+    python import_csv.py users users.csv --dry-run
+    python import_csv.py schedules schedules_2025.csv
+"""
+import argparse
+import json
+import sys
+
+from db import SessionLocal
+from services.import_service import IMPORTERS
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CSV の一括取り込み")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="検証と件数の集計のみ行い、反映しない")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as f:
+            report = IMPORTERS[args.kind](db, f, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    return 1 if report.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,53 +1,85 @@
-from db import engine, Base, SessionLocal
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+from db import SessionLocal, get_engine
 from models.user_model import User
 from datetime import date
-from passlib.context import CryptContext
-
-# パスワードハッシュ化用コンテキスト
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# テーブル作成
-Base.metadata.create_all(bind=engine)
-
-# ダミーデータの挿入
-db = SessionLocal()
-
-# ユーザーがまだいなければ挿入
-if not db.query(User).first():
-
-    hashed_pw = pwd_context.hash("password123")  # 任意の初期パスワード
-
-    user1 = User(
-        employee_number="1001",
-        hashed_password=hashed_pw,
-        name="佐藤",
-        email="sato@test.co.jp",
-        commuting_allowance="申請"
-    )
-    user2 = User(
-        employee_number="1002",
-        hashed_password=hashed_pw,
-        name="鈴木",
-        email="suzuki@test.co.jp",
-        commuting_allowance="停止"
-    )
-    user3 = User(
-        employee_number="1003",
-        hashed_password=hashed_pw,
-        name="佐野",
-        email="hiro-sano@foresight.co.jp",
-        commuting_allowance="申請"
-    )
-    db.add_all([user1, user2, user3])
-    db.commit()
-
-    # ユーザーIDを取得して勤務スケジュールを追加（例）
-    db.refresh(user1)
-    db.refresh(user2)
-
-    #schedule1 = WorkSchedule(user_id=user1.id, work_date=date(2025, 5, 1), location="東京")
-    #schedule2 = WorkSchedule(user_id=user2.id, work_date=date(2025, 5, 2), location="大阪")
-    #db.add_all([schedule1, schedule2])
-    db.commit()
-
-db.close()
\ No newline at end of file
+from core.password_utils import pwd_context
+
+# スキーマは Alembic のマイグレーションでのみ管理する（create_all は使わない）
+ALEMBIC_CONFIG = os.getenv(
+    "ALEMBIC_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "alembic.ini")
+)
+
+# Alembic 導入前（create_all）のスキーマに相当するリビジョン
+BASELINE_REVISION = "0001"
+
+def upgrade_schema(cfg: Config, connection: Connection):
+    """スキーマを最新にする
+
+    Alembic 導入前に create_all で作成した DB（テーブルはあるが alembic_version がない）は
+    0001 の内容が作成済みのため、0001 を適用済みとして記録してから upgrade する
+    """
+    cfg.attributes["connection"] = connection
+    tables = inspect(connection).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        print(f"Existing schema without Alembic version found; stamping {BASELINE_REVISION}")
+        command.stamp(cfg, BASELINE_REVISION)
+    command.upgrade(cfg, "head")
+
+def init_db():
+    with get_engine().begin() as connection:
+        upgrade_schema(Config(ALEMBIC_CONFIG), connection)
+
+def insert_sample_data():
+    # ダミーデータの挿入
+    db = SessionLocal()
+
+    # ユーザーがまだいなければ挿入
+    if not db.query(User).first():
+
+        hashed_pw = pwd_context.hash("password123")  # 任意の初期パスワード
+
+        user1 = User(
+            employee_number="1001",
+            hashed_password=hashed_pw,
+            name="佐藤",
+            email="sato@test.co.jp",
+            commuting_allowance="申請"
+        )
+        user2 = User(
+            employee_number="1002",
+            hashed_password=hashed_pw,
+            name="鈴木",
+            email="suzuki@test.co.jp",
+            commuting_allowance="停止"
+        )
+        user3 = User(
+            employee_number="1003",
+            hashed_password=hashed_pw,
+            name="佐野",
+            email="hiro-sano@foresight.co.jp",
+            commuting_allowance="申請"
+        )
+        db.add_all([user1, user2, user3])
+        db.commit()
+
+        # ユーザーIDを取得して勤務スケジュールを追加（例）
+        db.refresh(user1)
+        db.refresh(user2)
+
+        #schedule1 = WorkSchedule(user_id=user1.id, work_date=date(2025, 5, 1), location="東京")
+        #schedule2 = WorkSchedule(user_id=user2.id, work_date=date(2025, 5, 2), location="大阪")
+        #db.add_all([schedule1, schedule2])
+        db.commit()
+
+    db.close()
+
+if __name__ == "__main__":
+    init_db()
+    insert_sample_data()
@@ -1,77 +1,97 @@
 import os
 import logging
 
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 
-from api import schedules
-from api import user
-from api.routers import auth, auth_lambda, protected
 from config import settings
-from db import Base, engine
+from core.rate_limit import RateLimitMiddleware, rate_limiter
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(name)s - %(message)s"
 )
 
-# データベースの初期化
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # スキーマは Alembic（alembic upgrade head / init_db.py）で管理するため、ここでは作成しない
+    # DB エンジンは最初のリクエストで作成される
+    from core.events import schedule_events
 
-# Limiter の初期化（IPアドレス単位で制限）
-limiter = Limiter(key_func=get_remote_address)
+    await schedule_events.start()
+    if settings.rate_limit_enabled:
+        await rate_limiter.start()
+    yield
 
-# FastAPIアプリケーションのインスタンス作成
-app = FastAPI(
-    debug=settings.debug,
-    docs_url=None if not settings.debug else "/docs",
-    redoc_url=None if not settings.debug else "/redoc",
-    openapi_url=None if not settings.debug else "/openapi.json"
-)
+    from core.password_utils import password_hasher
+    from db import dispose_async_engine, dispose_engines
 
-# CORSのミドルウェアを追加
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[settings.frontend_origin],
-    allow_credentials=True,
-    allow_methods=["*"],  # すべてのHTTPメソッドを許可
-    allow_headers=["*"],  # すべてのヘッダーを許可
-)
-logging.info(f"Frontend origin: {settings.frontend_origin}")
+    await schedule_events.stop()
+    if settings.rate_limit_enabled:
+        await rate_limiter.stop()
+    password_hasher.shutdown()
+    dispose_engines()
+    await dispose_async_engine()
+
+def include_routers(app: FastAPI):
+    # ルーター（と CRUD・モデル）はアプリ作成時に import する
+    from api import calendar, imports, schedule_events, schedules, user
+    from api.routers import auth, auth_lambda, metrics, protected
+
+    app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
+    app.include_router(auth_lambda.router, prefix="/api/auth", tags=["auth_lambda"])
+    app.include_router(protected.router, prefix="/api/auth", tags=["protected"])
+    app.include_router(metrics.router, prefix="/api", tags=["metrics"])
+    app.include_router(calendar.router, prefix="/api", tags=["calendar"])
+    if settings.db_async:
+        # 非同期版は asyncpg を使うため、有効な場合だけ import する
+        # 同じパスのルートは先に登録したものが優先されるため、非同期版を先に登録する
+        from api import schedules_async, user_async
 
-# レート制限の追加
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse(
-    status_code=429,
-    content={"detail": "Rate limit exceeded"}
-))
-app.add_middleware(SlowAPIMiddleware)
+        app.include_router(user_async.router, prefix="/api")
+        app.include_router(schedules_async.router, prefix="/api")
+    app.include_router(user.service_router, prefix="/api")
+    app.include_router(user.router, prefix="/api")
+    app.include_router(schedules.router, prefix="/api")
+    app.include_router(schedule_events.router, prefix="/api")
+    app.include_router(imports.router, prefix="/api", tags=["imports"])
 
-if settings.env == "production":
+def create_app() -> FastAPI:
+    """FastAPI アプリケーションを作成する（import 時に DB へ接続しない）"""
+    app = FastAPI(
+        debug=settings.debug,
+        docs_url=None if not settings.debug else "/docs",
+        redoc_url=None if not settings.debug else "/redoc",
+        openapi_url=None if not settings.debug else "/openapi.json",
+        lifespan=lifespan
+    )
+
+    # レート制限の追加（CORS の内側に置き、429 にも CORS ヘッダーを付ける）
+    if settings.rate_limit_enabled:
+        app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+    # CORSのミドルウェアを追加
     app.add_middleware(
-        TrustedHostMiddleware,
-        allowed_hosts=[settings.domain]
+        CORSMiddleware,
+        allow_origins=[settings.frontend_origin],
+        allow_credentials=True,
+        allow_methods=["*"],  # すべてのHTTPメソッドを許可
+        allow_headers=["*"],  # すべてのヘッダーを許可
     )
+    logging.info(f"Frontend origin: {settings.frontend_origin}")
+
+    if settings.env == "production":
+        app.add_middleware(
+            TrustedHostMiddleware,
+            allowed_hosts=[settings.domain]
+        )
+
+    include_routers(app)
+    return app
 
-# ルーターをインクルード
-app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
-app.include_router(auth_lambda.router, prefix="/api/auth", tags=["auth_lambda"])
-app.include_router(protected.router, prefix="/api/auth", tags=["protected"])
-app.include_router(user.router, prefix="/api")
-app.include_router(schedules.router, prefix="/api")
-
-# 全体にレート制限（例：すべてのルートで IP 毎に1分間に30回まで）
-#@app.middleware("http")
-#async def global_rate_limiter(request: Request, call_next):
-#    if request.url.path in ["/docs", "/openapi.json", "/redoc"]:
-#        return await call_next(request)
-#    return await (call_next)(request)
-#    #return await limiter.limit("30/minute")(call_next)(request)
+app = create_app()
@@ -0,0 +1,10 @@
+from sqlalchemy import BigInteger, Column, DateTime, String, func
+from db import Base
+
+class DataVersion(Base):
+    """データ範囲（月別スケジュール・ユーザ一覧など）ごとの更新バージョン"""
+    __tablename__ = "data_versions"
+
+    key = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Float, String, func
+from db import Base
+
+class RateLimitBucket(Base):
+    """ワーカー間で共有するレート制限のバケット（失われても問題ないため UNLOGGED）"""
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    rate = Column(Float, nullable=False)
+    burst = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
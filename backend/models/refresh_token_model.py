@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from db import Base
+
+class RefreshTokenFamily(Base):
+    """リフレッシュトークンのファミリー（ログイン1回につき1行）
+
+    ローテーションのたびに current_jti を差し替える。使用済みのトークン（current_jti 以外）が
+    再び使われた場合は盗用とみなしてファミリーごと無効にする
+    """
+    __tablename__ = "refresh_token_families"
+
+    family_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    current_jti = Column(String, nullable=False)
+    # 直前のトークン（複数タブからの同時リフレッシュを猶予期間内は再利用とみなさない）
+    previous_jti = Column(String, nullable=True)
+    rotated_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, Identity, Index, Integer, String, func
+from db import Base
+
+class ScheduleChange(Base):
+    """作業場所スケジュールの変更履歴（追記のみ。id を差分取得のカーソルに使う）
+
+    location が NULL の行は削除を表す
+    """
+    __tablename__ = "schedule_changes"
+
+    __table_args__ = (
+        # 古い履歴の削除（コンパクション）用
+        Index("ix_schedule_changes_changed_at", "changed_at"),
+        # 月単位の差分取得（work_date の範囲 + id のカーソル）・月のカーソル（max(id)）用
+        Index("ix_schedule_changes_work_date_id", "work_date", "id"),
+    )
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    work_date = Column(Date, nullable=False)
+    location = Column(String, nullable=True)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index, UniqueConstraint
 from db import Base
 
 class WorkSchedule(Base):
     __tablename__ = "work_schedules"
 
+    UNIQUE_USER_DATE = "uq_work_schedules_user_id_work_date"
+
+    __table_args__ = (
+        # 1ユーザ1日1件（upsert の競合対象）
+        UniqueConstraint("user_id", "work_date", name=UNIQUE_USER_DATE),
+        # 月単位の範囲検索用
+        Index("ix_work_schedules_work_date_user_id", "work_date", "user_id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     work_date = Column(Date, nullable=False)
-    location = Column(String, nullable=False)
\ No newline at end of file
+    location = Column(String, nullable=False)
@@ -6,6 +6,10 @@ class LoginResponse(BaseModel):
     csrf_token: str
     is_default_password: bool
     
+class RefreshResponse(BaseModel):
+    message: str
+    csrf_token: str
+
 class PasswordChangeRequest(BaseModel):
     old_password: str
     new_password: str
\ No newline at end of file
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class ImportErrorItem(BaseModel):
+    line: int = Field(..., description="CSV の行番号（見出し行が1行目）")
+    message: str = Field(..., description="エラー内容")
+
+class ImportReportResponse(BaseModel):
+    kind: str = Field(..., description="取り込み対象（'schedules' または 'users'）")
+    dry_run: bool = Field(..., description="dry-run（検証と件数の集計のみ）かどうか")
+    total_rows: int = Field(..., description="CSV のデータ行数")
+    valid_rows: int = Field(..., description="検証を通過した行数")
+    skipped_rows: int = Field(..., description="空欄のため取り込まなかった行数")
+    inserted: int = Field(..., description="新規登録（dry-run の場合は登録される）件数")
+    updated: int = Field(..., description="更新（dry-run の場合は更新される）件数")
+    unchanged: int = Field(..., description="内容が同じため更新しなかった件数")
+    applied: bool = Field(..., description="データベースに反映したかどうか（エラーがある場合は反映しない）")
+    errors: List[ImportErrorItem] = Field(..., description="行ごとのエラー")
+    errors_truncated: bool = Field(..., description="エラーが上限を超えたため省略したかどうか")
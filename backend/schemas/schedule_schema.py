@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import date
-from typing import Optional
+from typing import Dict, List, Optional
+
+from utils.date_utils import MONTH_PATTERN
 
 class ScheduleBase(BaseModel):
     user_id: int = Field(..., description="ユーザID")
@@ -21,3 +23,50 @@ class ScheduleResponse(ScheduleBase):
 
     class Config:
         orm_mode = True
+
+class ScheduleBulkRequest(BaseModel):
+    items: List[ScheduleRequest] = Field(..., max_length=1000, description="登録・更新・削除するスケジュールの一覧")
+
+class ScheduleCopyRequest(BaseModel):
+    user_id: int = Field(..., description="ユーザID")
+    source_month: str = Field(..., pattern=MONTH_PATTERN, description="コピー元の月（YYYY-MM）")
+    target_month: str = Field(..., pattern=MONTH_PATTERN, description="コピー先の月（YYYY-MM）")
+
+class ScheduleBulkResult(ScheduleBase):
+    id: Optional[int] = Field(None, description="登録・更新されたスケジュールのID（削除時は null）")
+    status: str = Field(..., description="'saved' または 'deleted'")
+
+class ScheduleGridResponse(BaseModel):
+    month: str = Field(..., description="対象月（YYYY-MM）")
+    dates: List[date] = Field(..., description="対象月の日付一覧")
+    locations: List[str] = Field(..., description="作業場所の辞書（users の値はこの一覧のインデックス）")
+    users: Dict[int, List[Optional[int]]] = Field(
+        ...,
+        description="ユーザIDごとの日別作業場所インデックス（未登録日は null）"
+    )
+
+class ScheduleSummaryUser(BaseModel):
+    user_id: int = Field(..., description="ユーザID")
+    employee_number: str = Field(..., description="社員番号")
+    name: str = Field(..., description="氏名")
+    commuting_allowance: Optional[str] = Field(None, description="通勤手当の状態")
+    total_days: int = Field(..., description="期間内のスケジュール登録日数")
+    counts: Dict[str, int] = Field(..., description="作業場所ごとの日数（例: {'本': 12, '在': 8}）")
+
+class ScheduleSummaryResponse(BaseModel):
+    start_date: date = Field(..., description="集計開始日")
+    end_date: date = Field(..., description="集計終了日（この日を含む）")
+    locations: List[str] = Field(..., description="期間内に登録されている作業場所の一覧")
+    users: List[ScheduleSummaryUser] = Field(..., description="ユーザごとの作業場所別日数")
+
+class ScheduleChangeItem(BaseModel):
+    user_id: int = Field(..., description="ユーザID")
+    work_date: date = Field(..., description="勤務日")
+    location: Optional[str] = Field(None, description="変更後の作業場所（削除時は null）")
+
+class ScheduleChangesResponse(BaseModel):
+    month: str = Field(..., description="対象月（YYYY-MM）")
+    reset: bool = Field(..., description="カーソルが古すぎて差分を返せない場合 true（月全体を取得し直す）")
+    cursor: int = Field(..., description="次回の `since` に指定するカーソル")
+    has_more: bool = Field(..., description="続きの変更がある場合 true（cursor を指定して続けて取得する）")
+    changes: List[ScheduleChangeItem] = Field(..., description="セルごとの最新の変更")
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import List
 
 class TokenResponseBase(BaseModel):
     access_token: str
@@ -7,4 +8,10 @@ class TokenResponseBase(BaseModel):
     is_default_password: bool
 
 class LambdaLoginResponse(TokenResponseBase):
-    message: str
\ No newline at end of file
+    message: str
+
+class ServiceTokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int  # 秒
+    scopes: List[str]
@@ -18,4 +18,13 @@ class UserResponse(UserBase):
         orm_mode = True  # SQLAlchemyモデルと連携させるために必要
 
 class AllowanceUpdate(BaseModel):
-    allowance: str
\ No newline at end of file
+    allowance: str
+# 対象月の営業日に対するスケジュール登録状況
+class ScheduleCoverageResponse(BaseModel):
+    user_id: int
+    name: str
+    email: EmailStr
+    registered_business_days: int
+    expected_business_days: int
+    missing_business_days: int
+    status: str  # "missing"（未登録）/ "partial"（一部未登録）/ "complete"（登録済み）
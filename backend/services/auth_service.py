@@ -0,0 +1,26 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.password_utils import password_hasher
+from crud import user as crud_user
+from models.user_model import User
+
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """メールアドレスとパスワードでユーザを認証する
+
+    bcrypt の検証はハッシュ用プロセスプールで行い、コスト設定が変わっていれば再ハッシュして保存する
+    ハッシュ処理が混み合っている場合は PasswordHasherBusy を送出する
+    """
+    user = await run_in_threadpool(crud_user.get_user_by_email, db, email)
+    if not user:
+        return None
+
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+
+    if new_hash:
+        await run_in_threadpool(crud_user.rehash_user_password, db, user, new_hash)
+    return user
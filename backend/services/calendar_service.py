@@ -0,0 +1,78 @@
+import json
+import logging
+
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, FrozenSet, Optional, Tuple
+
+from config import BASE_DIR
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 祝日データ（バージョン付きでリポジトリに同梱。毎年の更新時に version を上げる）
+HOLIDAY_DATA_PATH = Path(BASE_DIR) / "data" / "holidays_jp.json"
+
+class UnsupportedCalendarYear(Exception):
+    """同梱の祝日データに含まれない年（祝日なしとして計算すると営業日数が誤るため、エラーにする）"""
+
+    def __init__(self, year: int):
+        super().__init__(f"Holiday data is not available for {year}")
+        self.year = year
+
+@lru_cache(maxsize=1)
+def _load_holiday_data() -> Tuple[str, Dict[date, str]]:
+    with open(HOLIDAY_DATA_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    holidays = {date.fromisoformat(day): name for day, name in data["holidays"].items()}
+    return data["version"], holidays
+
+def get_calendar_version() -> str:
+    return _load_holiday_data()[0]
+
+@lru_cache(maxsize=1)
+def get_supported_years() -> FrozenSet[int]:
+    """祝日データに含まれる年"""
+    _, holidays = _load_holiday_data()
+    return frozenset(day.year for day in holidays)
+
+@lru_cache(maxsize=32)
+def get_holidays(year: int) -> Dict[date, str]:
+    """指定年の祝日（データに含まれない年は UnsupportedCalendarYear）"""
+    if year not in get_supported_years():
+        logger.error(f"Holiday data is not available for {year} (version={get_calendar_version()})")
+        raise UnsupportedCalendarYear(year)
+    _, holidays = _load_holiday_data()
+    return {day: name for day, name in holidays.items() if day.year == year}
+
+@lru_cache(maxsize=32)
+def _busday_calendar(years: Tuple[int, ...]) -> "np.busdaycalendar":
+    # numpy は起動時間を延ばすため、初めて営業日を計算するときに import する
+    import numpy as np
+
+    holidays = [day for year in years for day in get_holidays(year)]
+    return np.busdaycalendar(weekmask="1111100", holidays=holidays)
+
+def count_business_days(start: date, end: date) -> int:
+    """[start, end) の営業日数"""
+    import numpy as np
+
+    calendar = _busday_calendar(tuple(range(start.year, end.year + 1)))
+    return int(np.busday_count(start, end, busdaycal=calendar))
+
+def is_past_business_days(from_date: date, days: int, today: Optional[date] = None) -> bool:
+    """from_date から today までに指定した営業日数が経過しているか
+
+    祝日データがない年は土日だけを除いて数える（通知を止めないため。警告ログを出す）
+    """
+    import numpy as np
+
+    today = today or date.today()
+    try:
+        return count_business_days(from_date, today) >= days
+    except UnsupportedCalendarYear as e:
+        logger.warning(f"{e}; counting weekdays only")
+        return int(np.busday_count(from_date, today, weekmask="1111100")) >= days
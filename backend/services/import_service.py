@@ -0,0 +1,323 @@
+import csv
+import logging
+import tempfile
+
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, TextIO
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config import settings
+from core.cache import principal_cache
+from core.events import schedule_events
+from core.password_utils import password_hasher
+from crud.data_version import USERS_KEY, bump_versions, schedule_month_key
+from crud.schedule import invalidate_months
+from models.schedule_model import WorkSchedule
+from utils.date_utils import parse_month
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_COLUMNS = ("employee_number", "work_date", "location")
+USER_COLUMNS = ("employee_number", "name", "email", "commuting_allowance")
+
+# COPY で読み込む一時テーブル（トランザクション終了時に削除される）
+SCHEDULE_STAGING = "schedule_import_staging"
+USER_STAGING = "user_import_staging"
+
+@dataclass
+class ImportReport:
+    kind: str
+    dry_run: bool
+    total_rows: int = 0
+    valid_rows: int = 0
+    skipped_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    applied: bool = False
+    errors: List[dict] = field(default_factory=list)
+    errors_truncated: bool = False
+
+    def add_error(self, line: int, message: str):
+        if len(self.errors) >= settings.import_max_errors:
+            self.errors_truncated = True
+            return
+        self.errors.append({"line": line, "message": message})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+# ---- 行の検証（1行ずつ読みながら行い、正しい行だけを COPY 用のファイルに書き出す） ----
+
+def _validate_schedule_row(row: Dict[str, str]) -> Optional[list]:
+    employee_number = (row.get("employee_number") or "").strip()
+    if not employee_number:
+        raise ValueError("employee_number is required")
+    try:
+        work_date = date.fromisoformat((row.get("work_date") or "").strip())
+    except ValueError:
+        raise ValueError("work_date must be in YYYY-MM-DD format")
+    location = (row.get("location") or "").strip()
+    if not location:
+        # 空欄はスケジュールなし（既存のスケジュールは削除しない）
+        return None
+    return [employee_number, work_date.isoformat(), location]
+
+def _validate_user_row(row: Dict[str, str]) -> Optional[list]:
+    values = [(row.get(column) or "").strip() for column in USER_COLUMNS]
+    employee_number, name, email, commuting_allowance = values
+    if not employee_number:
+        raise ValueError("employee_number is required")
+    if not name:
+        raise ValueError("name is required")
+    if "@" not in email:
+        raise ValueError("email is invalid")
+    return [employee_number, name, email, commuting_allowance or None]
+
+def _stage_rows(
+    db: Session,
+    stream: TextIO,
+    report: ImportReport,
+    columns: Sequence[str],
+    validate: Callable[[Dict[str, str]], Optional[list]],
+    staging: str,
+    staging_columns: str,
+) -> bool:
+    """CSV を検証しながら一時テーブルへ COPY する。読み込む行がない場合は False"""
+    reader = csv.DictReader(stream)
+    missing = [column for column in columns if column not in (reader.fieldnames or [])]
+    if missing:
+        report.add_error(1, f"Missing columns: {', '.join(missing)}")
+        return False
+
+    with tempfile.SpooledTemporaryFile(mode="w+", newline="", encoding="utf-8", max_size=8 * 1024 * 1024) as buffer:
+        writer = csv.writer(buffer)
+        for row in reader:
+            report.total_rows += 1
+            try:
+                values = validate(row)
+            except ValueError as e:
+                report.add_error(reader.line_num, str(e))
+                continue
+            if values is None:
+                report.skipped_rows += 1
+                continue
+            writer.writerow([reader.line_num] + values)
+            report.valid_rows += 1
+
+        if report.valid_rows == 0:
+            return False
+
+        buffer.seek(0)
+        db.execute(text(f"CREATE TEMP TABLE {staging} ({staging_columns}) ON COMMIT DROP"))
+        # セッションと同じトランザクション・接続で COPY する
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {staging} FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+    return True
+
+def _collect_errors(db: Session, report: ImportReport, stmt: str, **params):
+    # エラー行は上限 + 1 件だけ取得する（上限を超えたかどうかを判定するため）
+    for line, message in db.execute(text(stmt), {"limit": settings.import_max_errors + 1, **params}):
+        report.add_error(line, message)
+
+def _finish(db: Session, report: ImportReport, keys: List[str]) -> bool:
+    """エラーがなく dry-run でもなければコミットする（それ以外はすべて取り消す）"""
+    report.errors.sort(key=lambda error: error["line"])
+    if report.dry_run or report.errors:
+        db.rollback()
+        return False
+    if keys:
+        bump_versions(db, keys)
+    db.commit()
+    report.applied = True
+    return True
+
+# ---- スケジュール ----
+
+UNKNOWN_EMPLOYEE_SQL = f"""
+SELECT s.line, 'Unknown employee_number: ' || s.employee_number
+FROM {SCHEDULE_STAGING} s
+LEFT JOIN users u ON u.employee_number = s.employee_number
+WHERE u.id IS NULL
+ORDER BY s.line
+LIMIT :limit
+"""
+
+# 同じユーザ・日付はファイルの後の行を優先し、内容が変わらない行は更新しない
+MERGE_SCHEDULES_SQL = f"""
+WITH merged AS (
+    INSERT INTO work_schedules (user_id, work_date, location)
+    SELECT DISTINCT ON (u.id, s.work_date) u.id, s.work_date, s.location
+    FROM {SCHEDULE_STAGING} s
+    JOIN users u ON u.employee_number = s.employee_number
+    ORDER BY u.id, s.work_date, s.line DESC
+    ON CONFLICT ON CONSTRAINT {WorkSchedule.UNIQUE_USER_DATE}
+    DO UPDATE SET location = EXCLUDED.location
+    WHERE work_schedules.location IS DISTINCT FROM EXCLUDED.location
+    RETURNING (xmax = 0) AS inserted, user_id, work_date, location
+),
+logged AS (
+    INSERT INTO schedule_changes (user_id, work_date, location)
+    SELECT user_id, work_date, location FROM merged
+)
+SELECT
+    count(*) FILTER (WHERE inserted) AS inserted,
+    count(*) FILTER (WHERE NOT inserted) AS updated,
+    coalesce(array_agg(DISTINCT to_char(work_date, 'YYYY-MM')), '{{}}') AS months
+FROM merged
+"""
+
+STAGED_MONTHS_SQL = f"SELECT DISTINCT to_char(work_date, 'YYYY-MM') FROM {SCHEDULE_STAGING}"
+
+DISTINCT_SCHEDULES_SQL = f"""
+SELECT count(*) FROM (SELECT DISTINCT employee_number, work_date FROM {SCHEDULE_STAGING}) t
+"""
+
+def import_schedules_csv(db: Session, stream: TextIO, dry_run: bool = False) -> ImportReport:
+    """スケジュールの CSV（employee_number, work_date, location）を取り込む
+
+    検証済みの行を一時テーブルへ COPY し、1つの INSERT ... ON CONFLICT でまとめて反映する
+    エラーが1件でもあれば何も反映しない。dry_run の場合は件数だけを集計して取り消す
+    """
+    report = ImportReport(kind="schedules", dry_run=dry_run)
+    try:
+        staged = _stage_rows(
+            db, stream, report, SCHEDULE_COLUMNS, _validate_schedule_row,
+            SCHEDULE_STAGING, "line integer, employee_number text, work_date date, location text"
+        )
+        if not staged:
+            _finish(db, report, [])
+            return report
+
+        _collect_errors(db, report, UNKNOWN_EMPLOYEE_SQL)
+        distinct_rows = db.execute(text(DISTINCT_SCHEDULES_SQL)).scalar_one()
+        # 変更履歴の id 順を保つため、反映前に対象月のバージョンを更新して月の行ロックを取得する
+        staged_months = [parse_month(month) for month in db.execute(text(STAGED_MONTHS_SQL)).scalars()]
+        bump_versions(db, [schedule_month_key(month) for month in staged_months])
+        merged = db.execute(text(MERGE_SCHEDULES_SQL)).one()
+        report.inserted, report.updated = merged.inserted, merged.updated
+        report.unchanged = max(distinct_rows - report.inserted - report.updated, 0)
+
+        months = [parse_month(month) for month in merged.months]
+        if _finish(db, report, []):
+            invalidate_months(months)
+            schedule_events.publish_resync(merged.months)
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    logger.info(
+        f"Schedule import (dry_run={dry_run}): rows={report.total_rows} inserted={report.inserted} "
+        f"updated={report.updated} errors={len(report.errors)} applied={report.applied}"
+    )
+    return report
+
+# ---- ユーザ ----
+
+# メールアドレスが別の社員番号のユーザ（既存またはファイル内）と重複している行
+EMAIL_CONFLICT_SQL = f"""
+SELECT s.line, 'email is already used by another employee: ' || s.email
+FROM {USER_STAGING} s
+WHERE EXISTS (SELECT 1 FROM users u WHERE u.email = s.email AND u.employee_number <> s.employee_number)
+   OR EXISTS (SELECT 1 FROM {USER_STAGING} o WHERE o.email = s.email AND o.employee_number <> s.employee_number)
+ORDER BY s.line
+LIMIT :limit
+"""
+
+NEW_USER_SQL = f"""
+SELECT s.line, 'import_initial_password is not configured; cannot create employee ' || s.employee_number
+FROM {USER_STAGING} s
+WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.employee_number = s.employee_number)
+ORDER BY s.line
+LIMIT :limit
+"""
+
+MERGE_USERS_SQL = f"""
+WITH merged AS (
+    INSERT INTO users (employee_number, name, email, commuting_allowance, hashed_password, is_default_password)
+    SELECT DISTINCT ON (s.employee_number)
+        s.employee_number, s.name, s.email, s.commuting_allowance, :hashed_password, true
+    FROM {USER_STAGING} s
+    ORDER BY s.employee_number, s.line DESC
+    ON CONFLICT (employee_number)
+    DO UPDATE SET name = EXCLUDED.name, email = EXCLUDED.email, commuting_allowance = EXCLUDED.commuting_allowance
+    WHERE (users.name, users.email, users.commuting_allowance)
+        IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.email, EXCLUDED.commuting_allowance)
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted) AS inserted, count(*) FILTER (WHERE NOT inserted) AS updated
+FROM merged
+"""
+
+# 反映した場合の件数を SELECT で求める（エラーがある場合・dry-run はこの件数だけを返す）
+# （メールアドレスの重複は INSERT すると一意制約違反になるため）
+PREVIEW_USERS_SQL = f"""
+WITH latest AS (
+    SELECT DISTINCT ON (s.employee_number) s.employee_number, s.name, s.email, s.commuting_allowance
+    FROM {USER_STAGING} s
+    ORDER BY s.employee_number, s.line DESC
+)
+SELECT
+    count(*) FILTER (WHERE u.id IS NULL) AS inserted,
+    count(*) FILTER (
+        WHERE u.id IS NOT NULL
+          AND (u.name, u.email, u.commuting_allowance) IS DISTINCT FROM (l.name, l.email, l.commuting_allowance)
+    ) AS updated
+FROM latest l
+LEFT JOIN users u ON u.employee_number = l.employee_number
+"""
+
+DISTINCT_USERS_SQL = f"SELECT count(DISTINCT employee_number) FROM {USER_STAGING}"
+
+def import_users_csv(db: Session, stream: TextIO, dry_run: bool = False) -> ImportReport:
+    """ユーザの CSV（employee_number, name, email, commuting_allowance）を取り込む
+
+    社員番号が既存のユーザは氏名・メールアドレス・通勤手当を更新し、それ以外は初期パスワードで作成する
+    """
+    report = ImportReport(kind="users", dry_run=dry_run)
+    try:
+        staged = _stage_rows(
+            db, stream, report, USER_COLUMNS, _validate_user_row,
+            USER_STAGING, "line integer, employee_number text, name text, email text, commuting_allowance text"
+        )
+        if not staged:
+            _finish(db, report, [])
+            return report
+
+        _collect_errors(db, report, EMAIL_CONFLICT_SQL)
+        if not settings.import_initial_password:
+            _collect_errors(db, report, NEW_USER_SQL)
+
+        distinct_rows = db.execute(text(DISTINCT_USERS_SQL)).scalar_one()
+        merged = db.execute(text(PREVIEW_USERS_SQL)).one()
+        if not report.errors and not dry_run:
+            # 新規ユーザは全員同じ初期パスワード（新規作成がある場合だけ、ハッシュを1回計算する）
+            # 新規作成がなければ INSERT には使われないため仮の値
+            hashed_password = password_hasher.hash_blocking(settings.import_initial_password) if merged.inserted else ""
+            merged = db.execute(text(MERGE_USERS_SQL), {"hashed_password": hashed_password}).one()
+        report.inserted, report.updated = merged.inserted, merged.updated
+        report.unchanged = max(distinct_rows - report.inserted - report.updated, 0)
+
+        if _finish(db, report, [USERS_KEY] if report.inserted or report.updated else []):
+            principal_cache.clear()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    logger.info(
+        f"User import (dry_run={dry_run}): rows={report.total_rows} inserted={report.inserted} "
+        f"updated={report.updated} errors={len(report.errors)} applied={report.applied}"
+    )
+    return report
+
+IMPORTERS = {
+    "schedules": import_schedules_csv,
+    "users": import_users_csv,
+}
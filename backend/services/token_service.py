@@ -0,0 +1,62 @@
+import logging
+import secrets
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from core.security import create_refresh_token, decode_refresh_token
+from crud import refresh_token as crud_refresh
+
+logger = logging.getLogger(__name__)
+
+class InvalidRefreshToken(Exception):
+    """リフレッシュトークンが無効（期限切れ・失効・再利用）"""
+
+def _expires_at() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=settings.refresh_token_expire_minutes)
+
+async def issue_refresh_token(db: Session, user_id: int) -> str:
+    """ログイン時に新しいトークンファミリーを作成し、最初のリフレッシュトークンを返す"""
+    family_id, token_id = secrets.token_urlsafe(16), secrets.token_urlsafe(16)
+    await run_in_threadpool(crud_refresh.create_family, db, user_id, family_id, token_id, _expires_at())
+    return create_refresh_token(user_id, family_id, token_id)
+
+async def rotate_refresh_token(db: Session, token: Optional[str]) -> Tuple[int, Optional[str]]:
+    """リフレッシュトークンを検証して新しいものに差し替える（パスワードの検証は行わない）
+
+    戻り値は (user_id, 新しいリフレッシュトークン)
+    猶予期間内の同時リフレッシュの場合、新しいリフレッシュトークンは None（Cookie は更新済み）
+    """
+    payload = decode_refresh_token(token) if token else None
+    if payload is None:
+        raise InvalidRefreshToken()
+
+    new_token_id = secrets.token_urlsafe(16)
+    result, user_id = await run_in_threadpool(
+        crud_refresh.rotate_family,
+        db,
+        payload["fam"],
+        payload["jti"],
+        new_token_id,
+        _expires_at(),
+        timedelta(seconds=settings.refresh_reuse_grace_seconds),
+    )
+    if user_id is not None and str(user_id) != payload["sub"]:
+        raise InvalidRefreshToken()
+
+    if result == crud_refresh.ROTATED:
+        return user_id, create_refresh_token(user_id, payload["fam"], new_token_id)
+    if result == crud_refresh.GRACE:
+        return user_id, None
+    if result == crud_refresh.REUSED:
+        logger.warning(f"Refresh token reuse detected; revoked family for user_id={user_id}")
+    raise InvalidRefreshToken()
+
+async def revoke_refresh_token(db: Session, token: Optional[str]):
+    payload = decode_refresh_token(token) if token else None
+    if payload is not None:
+        await run_in_threadpool(crud_refresh.revoke_family, db, payload["fam"])
@@ -0,0 +1,70 @@
+import os
+import sys
+
+from pathlib import Path
+
+import pytest
+
+# アプリのモジュールは backend ディレクトリ直下から import する（from config import settings 等）
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sqlalchemy import create_engine, inspect, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+ALEMBIC_INI = BACKEND_DIR.parent / "alembic.ini"
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """テスト用の PostgreSQL（TEST_DATABASE_URL）。スキーマは作り直してマイグレーションで作成する
+
+    TEST_DATABASE_URL の DB は public スキーマごと削除されるため、専用の DB を指定すること
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from alembic.config import Config
+    from init_db import upgrade_schema
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    with engine.begin() as conn:
+        upgrade_schema(Config(str(ALEMBIC_INI)), conn)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(db_engine):
+    from core.cache import principal_cache, schedule_cache
+
+    session = Session(bind=db_engine)
+    try:
+        yield session
+    finally:
+        session.close()
+        principal_cache.clear()
+        # バージョンは TRUNCATE で1から振り直されるため、前のテストの ETag のレスポンスを残さない
+        schedule_cache.backend.clear()
+        with db_engine.begin() as conn:
+            tables = [table for table in inspect(conn).get_table_names() if table != "alembic_version"]
+            conn.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+
+@pytest.fixture
+def make_user(db):
+    from models.user_model import User
+
+    def make(employee_number: str = "1001", hashed_password: str = "x"):
+        user = User(
+            employee_number=employee_number,
+            hashed_password=hashed_password,
+            name=f"user{employee_number}",
+            email=f"{employee_number}@example.com",
+        )
+        db.add(user)
+        db.commit()
+        return user
+
+    return make
@@ -0,0 +1,82 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from core import cache as cache_module
+from core.cache import LocalLRUCache, MonthCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+def test_entries_expire_after_ttl(clock):
+    cache = LocalLRUCache(max_entries=10, ttl_seconds=30)
+    cache.set("a", 1)
+
+    clock.now += 29
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a") is None
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = LocalLRUCache(max_entries=2, ttl_seconds=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # 参照した "a" は最近使ったものとして残り、"b" が追い出される
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_month_cache_counts_hits_and_etag_mismatch_as_miss(clock):
+    month_cache = MonthCache(LocalLRUCache(max_entries=10, ttl_seconds=30))
+    month_cache.set("2025-04", "list", '"v1"', b"[]")
+
+    assert month_cache.get("2025-04", "list", '"v1"') == b"[]"
+    # 他ワーカーで更新された（ETag が変わった）場合はミス
+    assert month_cache.get("2025-04", "list", '"v2"') is None
+    assert month_cache.get("2025-05", "list", '"v1"') is None
+    assert month_cache.stats() == {"hits": 1, "misses": 2, "hit_ratio": 1 / 3}
+
+@pytest.fixture
+def schedule_cache(monkeypatch):
+    from crud import schedule as crud_schedule
+
+    month_cache = MonthCache(LocalLRUCache(max_entries=10, ttl_seconds=300))
+    monkeypatch.setattr(crud_schedule, "schedule_cache", month_cache)
+    for month in ("2025-04", "2025-05"):
+        for fmt in MonthCache.FORMATS:
+            month_cache.set(month, fmt, '"v1"', b"[]")
+    return month_cache
+
+def test_save_schedule_invalidates_its_month(schedule_cache):
+    from crud import schedule as crud_schedule
+
+    crud_schedule.save_schedule(mock.MagicMock(), 1, date(2025, 4, 10), "office")
+
+    for fmt in MonthCache.FORMATS:
+        assert schedule_cache.get("2025-04", fmt, '"v1"') is None
+        assert schedule_cache.get("2025-05", fmt, '"v1"') == b"[]"
+
+def test_delete_schedule_invalidates_its_month(schedule_cache):
+    from crud import schedule as crud_schedule
+
+    db = mock.MagicMock()
+    db.execute.return_value.scalar_one_or_none.return_value = 1
+    crud_schedule.delete_schedule(db, 1, date(2025, 5, 1))
+
+    for fmt in MonthCache.FORMATS:
+        assert schedule_cache.get("2025-05", fmt, '"v1"') is None
+        assert schedule_cache.get("2025-04", fmt, '"v1"') == b"[]"
@@ -0,0 +1,21 @@
+from datetime import date
+
+import pytest
+
+from services import calendar_service
+
+def test_unsupported_year_raises():
+    with pytest.raises(calendar_service.UnsupportedCalendarYear):
+        calendar_service.get_holidays(max(calendar_service.get_supported_years()) + 1)
+
+def test_business_days_exclude_holidays():
+    # 2025-01-01（元日）は祝日、01-04・01-05 は土日
+    assert calendar_service.count_business_days(date(2025, 1, 1), date(2025, 1, 8)) == 4
+
+def test_notification_check_falls_back_to_weekdays_for_unsupported_year():
+    year = max(calendar_service.get_supported_years()) + 1
+    first_day = date(year, 1, 1)
+
+    # 祝日を考慮できない年でも例外にせず、土日だけを除いて数える
+    assert calendar_service.is_past_business_days(first_day, 3, today=date(year, 1, 31))
+    assert not calendar_service.is_past_business_days(first_day, 3, today=first_day)
@@ -0,0 +1,22 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from api.schedule_common import parse_month_param
+from utils.date_utils import parse_month
+
+def test_parse_month():
+    assert parse_month("2025-05") == date(2025, 5, 1)
+    assert parse_month("2025-12") == date(2025, 12, 1)
+
+@pytest.mark.parametrize("month", ["2025-5", "2025-13", "2025-00", "2025-05-01", "2025-05\n", " 2025-05", "25-05", "２０２５-05"])
+def test_parse_month_rejects_non_canonical(month):
+    # '2025-5' なども 2025-05 と別のキャッシュキー・ETag になるため受け付けない
+    with pytest.raises(ValueError):
+        parse_month(month)
+
+def test_month_param_returns_422():
+    with pytest.raises(HTTPException) as exc_info:
+        parse_month_param("2025-5")
+    assert exc_info.value.status_code == 422
@@ -0,0 +1,92 @@
+import socket
+
+import pytest
+
+from aiosmtpd.controller import Controller
+
+from utils.email_service import EmailDispatcher, SMTPConnectionPool
+
+class RecordingHandler:
+    """受信したメールと接続元を記録するローカルの SMTP スタブ
+
+    TRANSIENT の宛先は最初の1回だけ 450、PERMANENT の宛先は常に 550 を返す
+    """
+
+    TRANSIENT = "retry@example.com"
+    PERMANENT = "unknown@example.com"
+
+    def __init__(self):
+        self.delivered = []
+        self.peers = set()
+        self.refused = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == self.PERMANENT:
+            return "550 No such user"
+        if address == self.TRANSIENT and address not in self.refused:
+            self.refused.add(address)
+            return "450 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.add(session.peer)
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    try:
+        yield controller, handler
+    finally:
+        controller.stop()
+
+def make_dispatcher(controller, concurrency=1, max_messages_per_connection=100) -> EmailDispatcher:
+    pool = SMTPConnectionPool(
+        host=controller.hostname,
+        port=controller.port,
+        size=concurrency,
+        starttls=False,
+        max_messages_per_connection=max_messages_per_connection,
+        timeout=5,
+    )
+    return EmailDispatcher(pool, concurrency=concurrency, max_retries=2, backoff_seconds=0)
+
+def test_connection_is_reused_across_messages(smtp_server):
+    controller, handler = smtp_server
+    recipients = [f"user{i}@example.com" for i in range(5)]
+
+    results = make_dispatcher(controller).send_bulk(recipients, "subject", "body")
+
+    assert [r.status for r in results] == ["sent"] * 5
+    assert sorted(handler.delivered) == sorted(recipients)
+    assert len(handler.peers) == 1
+
+def test_connection_is_renewed_after_message_limit(smtp_server):
+    controller, handler = smtp_server
+    recipients = [f"user{i}@example.com" for i in range(5)]
+
+    make_dispatcher(controller, max_messages_per_connection=2).send_bulk(recipients, "subject", "body")
+
+    assert len(handler.peers) == 3
+
+def test_transient_failure_is_retried_and_results_are_per_recipient(smtp_server):
+    controller, handler = smtp_server
+    recipients = ["ok@example.com", RecordingHandler.TRANSIENT, RecordingHandler.PERMANENT]
+
+    results = {r.to: r for r in make_dispatcher(controller, concurrency=2).send_bulk(recipients, "subject", "body")}
+
+    assert (results["ok@example.com"].status, results["ok@example.com"].attempts) == ("sent", 1)
+    assert (results[RecordingHandler.TRANSIENT].status, results[RecordingHandler.TRANSIENT].attempts) == ("sent", 2)
+    permanent = results[RecordingHandler.PERMANENT]
+    assert (permanent.status, permanent.attempts) == ("failed", 1)
+    assert "550" in permanent.error
+    assert sorted(handler.delivered) == ["ok@example.com", RecordingHandler.TRANSIENT]
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+from config import settings
+from core.password_utils import password_hasher, pwd_context
+from models.user_model import User
+from services.import_service import import_users_csv
+
+HEADER = "employee_number,name,email,commuting_allowance\n"
+
+@pytest.fixture
+def initial_password(monkeypatch):
+    monkeypatch.setattr(settings, "import_initial_password", "initial-pass")
+    yield "initial-pass"
+    password_hasher.shutdown()
+
+def test_new_users_share_one_initial_password_hash(db, initial_password):
+    csv = HEADER + "2001,New One,2001@example.com,1000\n2002,New Two,2002@example.com,0\n"
+    report = import_users_csv(db, io.StringIO(csv))
+
+    assert report.applied and report.inserted == 2
+    users = db.query(User).order_by(User.employee_number).all()
+    assert users[0].hashed_password == users[1].hashed_password
+    assert pwd_context.verify(initial_password, users[0].hashed_password)
+    assert all(user.is_default_password for user in users)
+
+def test_password_not_hashed_without_new_users(db, make_user, initial_password, monkeypatch):
+    def fail(_):
+        raise AssertionError("hash_blocking should not be called")
+
+    make_user("2001")
+    monkeypatch.setattr(password_hasher, "hash_blocking", fail)
+
+    # 既存ユーザの更新だけ、または dry-run ではハッシュを計算しない
+    report = import_users_csv(db, io.StringIO(HEADER + "2001,Renamed,2001@example.com,500\n"))
+    assert report.applied and report.updated == 1
+
+    report = import_users_csv(db, io.StringIO(HEADER + "2002,New,2002@example.com,0\n"), dry_run=True)
+    assert not report.applied and report.inserted == 1
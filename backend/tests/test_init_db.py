@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from init_db import upgrade_schema
+
+ALEMBIC_INI = str(Path(__file__).resolve().parents[2] / "alembic.ini")
+
+@pytest.fixture
+def legacy_connection(db_engine):
+    # 別スキーマに作成し、テスト用 DB の public スキーマには影響させない
+    with db_engine.connect() as conn:
+        conn.execute(text("CREATE SCHEMA legacy"))
+        conn.execute(text("SET search_path TO legacy"))
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(text("SET search_path TO public"))
+            conn.execute(text("DROP SCHEMA legacy CASCADE"))
+            conn.commit()
+
+def current_revision(conn) -> str:
+    return conn.execute(text("SELECT version_num FROM alembic_version")).scalar_one()
+
+def test_unstamped_schema_is_stamped_then_upgraded(legacy_connection):
+    config = Config(ALEMBIC_INI)
+    head = ScriptDirectory.from_config(config).get_current_head()
+
+    # create_all で作成した Alembic 導入前の DB（0001 のテーブルだけがあり alembic_version がない）
+    config.attributes["connection"] = legacy_connection
+    command.upgrade(config, "0001")
+    legacy_connection.execute(text("DROP TABLE alembic_version"))
+    legacy_connection.commit()
+
+    upgrade_schema(Config(ALEMBIC_INI), legacy_connection)
+    legacy_connection.commit()
+
+    assert current_revision(legacy_connection) == head
+    assert "schedule_changes" in inspect(legacy_connection).get_table_names()
+
+def test_empty_database_is_upgraded_from_scratch(legacy_connection):
+    config = Config(ALEMBIC_INI)
+
+    upgrade_schema(config, legacy_connection)
+    legacy_connection.commit()
+
+    assert current_revision(legacy_connection) == ScriptDirectory.from_config(config).get_current_head()
@@ -0,0 +1,128 @@
+import asyncio
+
+from core import rate_limit
+from core.jwt_backend import TokenError
+from core.rate_limit import (
+    LocalRateLimitStore,
+    RateLimiter,
+    RateLimitMiddleware,
+    RateLimitRule,
+    parse_rate,
+)
+
+def make_limiter(store=None, default="3/hour", user="5/hour", routes=None) -> RateLimiter:
+    # 補充量が小さい制限にして、テスト中の補充を無視できるようにする
+    return RateLimiter(
+        store=store or LocalRateLimitStore(),
+        default_rule=RateLimitRule.from_setting("default", default) if default else None,
+        user_rule=RateLimitRule.from_setting("user", user) if user else None,
+        route_rules=[RateLimitRule.from_setting(route, rate, route) for route, rate in (routes or {}).items()],
+    )
+
+def allowed(limiter: RateLimiter, count: int, method="GET", path="/api/schedules", client="10.0.0.1", user=None):
+    return sum(1 for _ in range(count) if limiter.check(method, path, client, user) == 0)
+
+def test_parse_rate():
+    assert parse_rate("30/minute") == (0.5, 30.0)
+    assert parse_rate("2/second") == (2.0, 2.0)
+    for invalid in ("30/day", "0/minute", "abc"):
+        try:
+            parse_rate(invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f"{invalid} should be rejected")
+
+def test_anonymous_requests_are_limited_per_ip():
+    limiter = make_limiter()
+
+    assert allowed(limiter, 5) == 3
+    assert limiter.check("GET", "/api/schedules", "10.0.0.1", None) > 0
+    # 別の IP アドレスは別のバケット
+    assert allowed(limiter, 3, client="10.0.0.2") == 3
+
+def test_authenticated_requests_do_not_use_ip_bucket():
+    limiter = make_limiter()
+
+    # 同じ IP アドレス（NAT 配下）の複数ユーザは、それぞれユーザごとの上限まで使える
+    assert allowed(limiter, 5, user="1") == 5
+    assert allowed(limiter, 5, user="2") == 5
+    assert allowed(limiter, 1, user="1") == 0
+    # 認証済みのリクエストは IP アドレスの上限を消費しない
+    assert allowed(limiter, 3) == 3
+
+def test_route_rule_applies_per_identity():
+    limiter = make_limiter(default=None, user=None, routes={"POST /api/auth/login": "2/hour"})
+
+    assert allowed(limiter, 3, method="POST", path="/api/auth/login") == 2
+    # メソッドが違うルートは対象外
+    assert allowed(limiter, 3, method="GET", path="/api/auth/login") == 3
+    assert allowed(limiter, 2, method="POST", path="/api/auth/login", client="10.0.0.2") == 2
+
+def test_rejected_request_consumes_no_bucket():
+    limiter = make_limiter(default="3/hour", routes={"POST /api/auth/login": "1/hour"})
+
+    assert allowed(limiter, 3, method="POST", path="/api/auth/login") == 1
+    # ルートの上限で拒否したリクエストは全ルート共通の上限を減らさない
+    assert allowed(limiter, 3) == 2
+
+    limiter = make_limiter(default="1/hour", routes={"POST /api/auth/login": "2/hour"})
+    assert allowed(limiter, 1) == 1
+    # 全ルート共通の上限で拒否した場合も、ルートのバケットは減らさない
+    assert allowed(limiter, 2, method="POST", path="/api/auth/login") == 0
+    assert limiter._buckets["POST /api/auth/login:ip:10.0.0.1"].pending == 0
+
+def test_invalid_token_is_not_verified_again(monkeypatch):
+    calls = []
+
+    def verify_token(token):
+        calls.append(token)
+        raise TokenError("invalid")
+
+    monkeypatch.setattr(rate_limit, "verify_token", verify_token)
+    rate_limit.invalid_token_cache.clear()
+    scope = {"headers": [(b"authorization", b"Bearer forged")]}
+
+    assert rate_limit._request_user(scope) is None
+    assert rate_limit._request_user(scope) is None
+    assert calls == ["forged"]
+
+def test_limit_is_shared_between_workers_after_sync():
+    store = LocalRateLimitStore()
+    worker_a = make_limiter(store)
+    worker_b = make_limiter(store)
+
+    async def run():
+        assert allowed(worker_a, 2) == 2
+        await worker_a.sync()
+        # 同期前は手元のバケットだけで判定し、同期すると worker_a の消費量が反映される
+        assert allowed(worker_b, 1) == 1
+        await worker_b.sync()
+        assert allowed(worker_b, 1) == 0
+
+    asyncio.run(run())
+
+def test_middleware_returns_429_with_retry_after():
+    limiter = make_limiter(default="1/hour")
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+
+    async def run():
+        middleware = RateLimitMiddleware(app, limiter)
+        scope = {"type": "http", "method": "GET", "path": "/api/schedules", "client": ("10.0.0.1", 1234), "headers": []}
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, None, send)
+        await middleware(scope, None, send)
+        return sent
+
+    sent = asyncio.run(run())
+    assert calls == ["/api/schedules"]
+    assert sent[0]["status"] == 429
+    headers = dict(sent[0]["headers"])
+    assert int(headers[b"retry-after"]) >= 1
+    assert limiter.stats()["rejected"] == 1
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+from crud import refresh_token as crud_refresh
+from crud import user as crud_user
+from models.refresh_token_model import RefreshTokenFamily
+
+GRACE = timedelta(seconds=30)
+
+def expires_at() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=7)
+
+def test_rotate_replaces_current_token(db, make_user):
+    user = make_user()
+    crud_refresh.create_family(db, user.id, "fam", "jti-1", expires_at())
+
+    assert crud_refresh.rotate_family(db, "fam", "jti-1", "jti-2", expires_at(), GRACE) == (crud_refresh.ROTATED, user.id)
+    assert crud_refresh.rotate_family(db, "fam", "jti-2", "jti-3", expires_at(), GRACE) == (crud_refresh.ROTATED, user.id)
+
+def test_previous_token_within_grace_is_tolerated(db, make_user):
+    user = make_user()
+    crud_refresh.create_family(db, user.id, "fam", "jti-1", expires_at())
+    crud_refresh.rotate_family(db, "fam", "jti-1", "jti-2", expires_at(), GRACE)
+
+    # 別のタブが同時に直前のトークンでリフレッシュした
+    assert crud_refresh.rotate_family(db, "fam", "jti-1", "jti-x", expires_at(), GRACE) == (crud_refresh.GRACE, user.id)
+    # ファミリーは有効なまま（現在のトークンで続けてローテーションできる）
+    assert crud_refresh.rotate_family(db, "fam", "jti-2", "jti-3", expires_at(), GRACE)[0] == crud_refresh.ROTATED
+
+def test_reused_token_revokes_family(db, make_user):
+    user = make_user()
+    crud_refresh.create_family(db, user.id, "fam", "jti-1", expires_at())
+    crud_refresh.rotate_family(db, "fam", "jti-1", "jti-2", expires_at(), GRACE)
+
+    # 猶予期間を過ぎた使用済みトークンは盗用とみなす
+    assert crud_refresh.rotate_family(db, "fam", "jti-1", "jti-x", expires_at(), timedelta(0)) == (
+        crud_refresh.REUSED, user.id
+    )
+    assert db.get(RefreshTokenFamily, "fam").revoked_at is not None
+    # 正規の利用者が持つ現在のトークンも使えなくなる
+    assert crud_refresh.rotate_family(db, "fam", "jti-2", "jti-3", expires_at(), GRACE) == (crud_refresh.INVALID, None)
+
+def test_password_change_revokes_all_families(db, make_user):
+    user = make_user()
+    other = make_user("1002")
+    crud_refresh.create_family(db, user.id, "fam-a", "jti-a", expires_at())
+    crud_refresh.create_family(db, user.id, "fam-b", "jti-b", expires_at())
+    crud_refresh.create_family(db, other.id, "fam-c", "jti-c", expires_at())
+
+    crud_user.update_user_password(db, user, "new-hash")
+
+    for family_id, jti in (("fam-a", "jti-a"), ("fam-b", "jti-b")):
+        assert crud_refresh.rotate_family(db, family_id, jti, "new", expires_at(), GRACE) == (crud_refresh.INVALID, None)
+    # 他のユーザのログインには影響しない
+    assert crud_refresh.rotate_family(db, "fam-c", "jti-c", "new", expires_at(), GRACE)[0] == crud_refresh.ROTATED
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta, timezone
+
+from crud import schedule as crud_schedule
+from crud import schedule_change as crud_change
+
+def test_changes_since_cursor_return_latest_per_cell(db, make_user):
+    user = make_user()
+    assert crud_change.get_changes(db, "2025-05", None)["cursor"] == 0
+
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 1), "在")
+    cursor = crud_change.get_changes(db, "2025-05", None)["cursor"]
+    assert cursor > 0
+
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 2), "在")
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 2), "本")
+    crud_schedule.delete_schedule(db, user.id, date(2025, 5, 1))
+    crud_schedule.save_schedule(db, user.id, date(2025, 6, 1), "外")
+
+    result = crud_change.get_changes(db, "2025-05", cursor)
+    assert not result["reset"] and not result["has_more"]
+    assert result["changes"] == [
+        {"user_id": user.id, "work_date": date(2025, 5, 2), "location": "本"},
+        {"user_id": user.id, "work_date": date(2025, 5, 1), "location": None},
+    ]
+    # 次のカーソルからは差分なし。カーソルは月ごと（別の月の変更は含まない）
+    assert crud_change.get_changes(db, "2025-05", result["cursor"])["changes"] == []
+    assert result["cursor"] == crud_change.get_month_cursor(db, "2025-05")
+    assert crud_change.get_month_cursor(db, "2025-06") > result["cursor"]
+
+def test_changes_are_paged_by_limit(db, make_user):
+    user = make_user()
+    for day in (1, 2, 3):
+        crud_schedule.save_schedule(db, user.id, date(2025, 5, day), "在")
+
+    first = crud_change.get_changes(db, "2025-05", 0, limit=2)
+    assert first["has_more"] and len(first["changes"]) == 2
+    rest = crud_change.get_changes(db, "2025-05", first["cursor"], limit=2)
+    assert not rest["has_more"]
+    assert rest["changes"] == [{"user_id": user.id, "work_date": date(2025, 5, 3), "location": "在"}]
+
+def test_compaction_resets_stale_cursor(db, make_user):
+    user = make_user()
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 1), "在")
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 2), "在")
+
+    assert crud_change.compact_changes(db, datetime.now(timezone.utc) + timedelta(seconds=1)) == 2
+
+    # 削除済みの履歴を指すカーソルは reset（月全体の取り直し）になり、削除済みの範囲より前には戻らない
+    result = crud_change.get_changes(db, "2025-05", 0)
+    assert result["reset"] and result["changes"] == []
+    assert result["cursor"] >= crud_change.get_version(db, crud_change.COMPACTED_KEY).version
+
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 3), "本")
+    resumed = crud_change.get_changes(db, "2025-05", result["cursor"])
+    assert not resumed["reset"]
+    assert resumed["changes"] == [{"user_id": user.id, "work_date": date(2025, 5, 3), "location": "本"}]
@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from api.schedules import bulk_update_schedules
+from crud import schedule as crud_schedule
+from models.schedule_model import WorkSchedule
+from schemas.schedule_schema import ScheduleBulkRequest
+
+def test_bulk_apply_rejects_unknown_user(db, make_user):
+    user = make_user()
+    items = [(user.id, date(2025, 5, 1), "在"), (user.id + 100, date(2025, 5, 1), "本")]
+
+    with pytest.raises(crud_schedule.UnknownUsers) as exc_info:
+        crud_schedule.bulk_apply_schedules(db, items)
+    assert exc_info.value.user_ids == [user.id + 100]
+    # 1件でも存在しないユーザがあれば何も反映しない
+    assert db.query(WorkSchedule).count() == 0
+
+def test_bulk_delete_of_unknown_user_is_ignored(db, make_user):
+    user = make_user()
+    results = crud_schedule.bulk_apply_schedules(db, [(user.id + 100, date(2025, 5, 1), None)])
+    assert results[0]["status"] == "deleted"
+
+def test_bulk_endpoint_returns_422_for_unknown_user(db, make_user):
+    user = make_user()
+    data = ScheduleBulkRequest(items=[{"user_id": user.id + 100, "work_date": "2025-05-01", "location": "在"}])
+
+    with pytest.raises(HTTPException) as exc_info:
+        bulk_update_schedules(data, db)
+    assert exc_info.value.status_code == 422
+    assert str(user.id + 100) in exc_info.value.detail
+
+def test_save_schedule_inserts_then_updates_same_cell(db, make_user):
+    user = make_user()
+    work_date = date(2025, 5, 1)
+
+    created = crud_schedule.save_schedule(db, user.id, work_date, "在")
+    updated = crud_schedule.save_schedule(db, user.id, work_date, "本")
+
+    # 同じユーザ・日付は1行のまま更新され、更新後の作業場所を返す
+    assert updated.id == created.id
+    assert updated.location == "本"
+    rows = db.query(WorkSchedule).filter_by(user_id=user.id, work_date=work_date).all()
+    assert [row.location for row in rows] == ["本"]
+
+def test_bulk_apply_updates_existing_cell(db, make_user):
+    user = make_user()
+    work_date = date(2025, 5, 1)
+    existing = crud_schedule.save_schedule(db, user.id, work_date, "在")
+
+    # 同じセルが複数回含まれる場合は後の項目が優先される
+    results = crud_schedule.bulk_apply_schedules(db, [(user.id, work_date, "外"), (user.id, work_date, "本")])
+
+    assert results == [
+        {"id": existing.id, "user_id": user.id, "work_date": work_date, "location": "本", "status": "saved"}
+    ]
+    rows = db.query(WorkSchedule).filter_by(user_id=user.id, work_date=work_date).all()
+    assert [row.location for row in rows] == ["本"]
@@ -0,0 +1,58 @@
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import schedules
+from core.security import get_current_user
+from crud import schedule as crud_schedule
+from db import get_db
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(schedules.router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: None
+    return TestClient(app)
+
+def test_month_etag_and_not_modified(client, db, make_user):
+    user = make_user()
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 1), "在")
+
+    first = client.get("/api/schedules", params={"month": "2025-05"})
+    assert first.status_code == 200
+    assert [row["location"] for row in first.json()] == ["在"]
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/schedules", params={"month": "2025-05"}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    # 別の月の更新では ETag は変わらない
+    crud_schedule.save_schedule(db, user.id, date(2025, 6, 1), "本")
+    assert client.get("/api/schedules", params={"month": "2025-05"}, headers={"If-None-Match": etag}).status_code == 304
+
+    # 対象月が更新されると新しい ETag で内容を返す
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 1), "本")
+    changed = client.get("/api/schedules", params={"month": "2025-05"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [row["location"] for row in changed.json()] == ["本"]
+
+def test_grid_format_has_its_own_etag(client, db, make_user):
+    user = make_user()
+    crud_schedule.save_schedule(db, user.id, date(2025, 5, 1), "在")
+
+    listed = client.get("/api/schedules", params={"month": "2025-05"})
+    grid = client.get("/api/schedules", params={"month": "2025-05", "format": "grid"})
+    assert grid.status_code == 200
+    assert grid.headers["ETag"] != listed.headers["ETag"]
+    assert client.get(
+        "/api/schedules", params={"month": "2025-05", "format": "grid"}, headers={"If-None-Match": listed.headers["ETag"]}
+    ).status_code == 200
+
+def test_non_canonical_month_is_rejected(client):
+    assert client.get("/api/schedules", params={"month": "2025-5"}).status_code == 422
+    assert client.get("/api/schedules", params={"format": "grid"}).status_code == 422
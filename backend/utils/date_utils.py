@@ -0,0 +1,47 @@
+import re
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+# 'YYYY-MM'（月は2桁）。キャッシュキー・ETag に使うため、'2025-5' などの別表記は受け付けない
+MONTH_PATTERN = r"^[0-9]{4}-(0[1-9]|1[0-2])$"
+_MONTH_RE = re.compile(MONTH_PATTERN)
+
+def parse_month(month: str) -> date:
+    """'YYYY-MM' 形式の文字列を月初日に変換する（不正な形式は ValueError）"""
+    if not _MONTH_RE.fullmatch(month):
+        raise ValueError(f"month must be in YYYY-MM format: {month!r}")
+    return date(int(month[:4]), int(month[5:]), 1)
+
+def next_month(first_day: date) -> date:
+    if first_day.month == 12:
+        return date(first_day.year + 1, 1, 1)
+    return date(first_day.year, first_day.month + 1, 1)
+
+def month_range(month: str) -> Tuple[date, date]:
+    """対象月の [月初, 翌月初) の半開区間を返す"""
+    first_day = parse_month(month)
+    return first_day, next_month(first_day)
+
+def month_range_of(year: int, month: int) -> Tuple[date, date]:
+    first_day = date(year, month, 1)
+    return first_day, next_month(first_day)
+
+def business_days(start: date, end: date, holidays: Iterable[date] = ()) -> List[date]:
+    """[start, end) のうち土日・祝日を除いた日付を返す"""
+    holiday_set = set(holidays)
+    days = []
+    current = start
+    while current < end:
+        if current.weekday() < 5 and current not in holiday_set:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+def months_in_range(start: date, end: date) -> List[date]:
+    """[start, end) に含まれる月の月初日を返す"""
+    months = []
+    current = start.replace(day=1)
+    while current < end:
+        months.append(current)
+        current = next_month(current)
+    return months
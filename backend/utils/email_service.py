@@ -1,15 +1,175 @@
+import logging
+import queue
 import smtplib
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from email.mime.text import MIMEText
+from typing import Iterable, List, Optional
 
 from config import settings
 
-def send_email(to: str, subject: str, body: str):
+logger = logging.getLogger(__name__)
+
+def _build_message(to: str, subject: str, body: str) -> MIMEText:
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = settings.smtp_user
     msg["To"] = to
+    return msg
+
+def send_email(to: str, subject: str, body: str):
+    msg = _build_message(to, subject, body)
 
     with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-        server.starttls()
-        server.login(settings.smtp_user, settings.smtp_password)
+        if settings.smtp_starttls:
+            server.starttls()
+        if settings.smtp_login:
+            server.login(settings.smtp_user, settings.smtp_password)
         server.send_message(msg)
+
+@dataclass
+class EmailResult:
+    to: str
+    status: str  # "sent" / "failed"
+    attempts: int
+    error: Optional[str] = None
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+
+class SMTPConnectionPool:
+    """認証済み SMTP 接続を使い回すプール（接続は必要になった時点で作成する）"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        max_messages_per_connection: int = 100,
+        timeout: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_messages_per_connection = max_messages_per_connection
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> _PooledConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def acquire(self) -> _PooledConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn: _PooledConnection, broken: bool = False):
+        # 壊れた接続や、1接続あたりの送信上限に達した接続は閉じる
+        if broken or conn.sent >= self.max_messages_per_connection:
+            self._close(conn.server)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._close(conn.server)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn.server)
+
+def _is_transient(error: Exception) -> bool:
+    # 4xx 応答・切断・接続エラーは再試行する
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+class EmailDispatcher:
+    """SMTP 接続プールを使い、同時実行数を制限して一括送信する
+
+    一時的なエラーは指数バックオフで再試行し、宛先ごとの結果を返す
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, concurrency: int, max_retries: int, backoff_seconds: float):
+        self.pool = pool
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    def _send_one(self, to: str, subject: str, body: str) -> EmailResult:
+        msg = _build_message(to, subject, body)
+        attempts = 0
+        while True:
+            attempts += 1
+            conn = None
+            try:
+                conn = self.pool.acquire()
+                conn.server.send_message(msg)
+                conn.sent += 1
+                self.pool.release(conn)
+                return EmailResult(to=to, status="sent", attempts=attempts)
+            except Exception as e:
+                if conn is not None:
+                    self.pool.release(conn, broken=not isinstance(e, smtplib.SMTPRecipientsRefused))
+                if attempts > self.max_retries or not _is_transient(e):
+                    logger.warning(f"Email to {to} failed after {attempts} attempt(s): {e}")
+                    return EmailResult(to=to, status="failed", attempts=attempts, error=str(e))
+                time.sleep(self.backoff_seconds * (2 ** (attempts - 1)))
+
+    def send_bulk(self, recipients: Iterable[str], subject: str, body: str) -> List[EmailResult]:
+        recipients = list(recipients)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(lambda to: self._send_one(to, subject, body), recipients))
+        self.pool.close()
+
+        sent = sum(1 for r in results if r.status == "sent")
+        logger.info(f"Bulk email finished: sent={sent}, failed={len(results) - sent}")
+        return results
+
+def create_dispatcher() -> EmailDispatcher:
+    pool = SMTPConnectionPool(
+        host=settings.smtp_host,
+        port=settings.smtp_port,
+        size=settings.smtp_pool_size,
+        username=settings.smtp_user if settings.smtp_login else None,
+        password=settings.smtp_password,
+        starttls=settings.smtp_starttls,
+        max_messages_per_connection=settings.smtp_max_messages_per_connection,
+    )
+    return EmailDispatcher(
+        pool,
+        concurrency=settings.smtp_pool_size,
+        max_retries=settings.smtp_max_retries,
+        backoff_seconds=settings.smtp_retry_backoff_seconds,
+    )
@@ -0,0 +1,44 @@
+import csv
+import io
+import tempfile
+
+from typing import Iterable, Iterator, List
+
+# Excel で文字化けしないよう UTF-8 の BOM を付ける
+CSV_BOM = "\ufeff"
+CHUNK_SIZE = 64 * 1024
+
+def iter_csv(rows: Iterable[List[str]], rows_per_chunk: int = 100) -> Iterator[bytes]:
+    """行を CSV にして、数十行ずつのバイト列で返す"""
+    buffer = io.StringIO()
+    buffer.write(CSV_BOM)
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def iter_xlsx(rows: Iterable[List[str]], sheet_title: str = "schedules") -> Iterator[bytes]:
+    """行を XLSX にして、ファイルの内容を少しずつ返す
+
+    openpyxl の write_only モードで一時ファイルへ書き出すため、行数によらずメモリ使用量は一定
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
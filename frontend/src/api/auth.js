@@ -29,9 +29,35 @@ api.interceptors.request.use((config) => {
     return config
 })
 
+// 同時に複数のリクエストが 401 になっても、リフレッシュは1回だけ行う
+// （使用済みのリフレッシュトークンを再送するとログインごと無効になるため）
+let refreshing = null
+
+function refreshOnce() {
+    if (!refreshing) {
+        refreshing = api.post('/auth/refresh', null, { withCredentials: true, _skipRefresh: true })
+            .finally(() => { refreshing = null })
+    }
+    return refreshing
+}
+
 api.interceptors.response.use(
     response => response,
-    error => {
+    async error => {
+        const config = error.config
+        // アクセストークンの期限切れはリフレッシュして1回だけ再試行する
+        if (error.response?.status === 401 && config && !config._skipRefresh && !config._retried
+            && !config.url.startsWith('/auth/login')) {
+            config._retried = true
+            try {
+                await refreshOnce()
+                return api(config)
+            } catch (refreshError) {
+                // リフレッシュの失敗時にログインを促しているため、ここでは通知しない
+                return Promise.reject(error)
+            }
+        }
+
         if (error.response) {
             // サーバーからのレスポンスがあり、ステータスコードがエラーの場合
             const status = error.response.status
@@ -73,9 +99,7 @@ export async function login(email, password) {
 }
 
 export async function refreshToken() {
-    const response = await api.post('/auth/refresh', null, {
-        withCredentials: true
-    })
+    const response = await refreshOnce()
     return response.data
 }
 
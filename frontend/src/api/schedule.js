@@ -1,8 +1,5 @@
-import axios from 'axios'
 import { api } from './auth.js'
 
-const THIRDPARTY_URL = import.meta.env.THIRDPARTY_URL || 'https://holidays-jp.github.io'
-
 export async function fetchUsers() {
     const res = await api.get('/users')
     return res.data
@@ -25,8 +22,62 @@ export async function updateCommutingAllowance(userId, newAllowance) {
     await api.patch(`/users/${userId}/commuting_allowance`, { allowance: newAllowance })
 }
 
-// 祝日取得
+// 祝日取得（サーバの祝日カレンダー。長期キャッシュされる）
 export async function fetchHolidays(year) {
-    const res = await axios.get(`${THIRDPARTY_URL}/api/v1/${year}/date.json`)
-    return await res.data // 例: { "2025-01-01": "元日", ... }
-}
\ No newline at end of file
+    const res = await api.get(`/calendar/${year}`)
+    return res.data.holidays // 例: { "2025-01-01": "元日", ... }
+}
+
+// items: [{ user_id, work_date, location }, ...]
+export async function updateSchedulesBulk(items) {
+    const res = await api.post('/schedules/bulk', { items })
+    return res.data
+}
+
+export async function copyMonthSchedules(userId, sourceMonth, targetMonth) {
+    const res = await api.post('/schedules/copy', {
+        user_id: userId,
+        source_month: sourceMonth,
+        target_month: targetMonth
+    })
+    return res.data
+}
+
+// { month, dates: [...], locations: [...], users: { user_id: [locationIndex or null, ...] } }
+export async function fetchScheduleGrid(month) {
+    const res = await api.get('/schedules', { params: { month, format: 'grid' } })
+    return res.data
+}
+
+// 作業場所の集計（月 または 期間）。params: { month } または { start_date, end_date }
+// { start_date, end_date, locations: [...], users: [{ user_id, name, commuting_allowance, total_days, counts: { '本': 12, ... } }] }
+export async function fetchScheduleSummary(params) {
+    const res = await api.get('/schedules/summary', { params })
+    return res.data
+}
+
+// ユーザ × 日付の表を CSV / XLSX でダウンロードする。params: { month } または { start_date, end_date }
+export async function exportSchedules(params, format = 'csv') {
+    const res = await api.get('/schedules/export', { params: { ...params, format }, responseType: 'blob' })
+    return res.data
+}
+
+// 月のスケジュール変更をリアルタイムに受け取る（Server-Sent Events）
+// onChanges: ([{ user_id, work_date, location }]) => void（削除時は location が null）
+// onResync: () => void（月のスケジュールを再取得する）
+// 戻り値の関数を呼ぶと購読を終了する
+export function subscribeScheduleEvents(month, { onChanges, onResync }) {
+    const url = `${api.defaults.baseURL}/schedules/events?month=${encodeURIComponent(month)}`
+    const source = new EventSource(url, { withCredentials: true })
+    source.addEventListener('changes', (e) => onChanges(JSON.parse(e.data).changes))
+    source.addEventListener('resync', () => onResync())
+    return () => source.close()
+}
+
+// 月のスケジュールの差分取得
+// since を省略すると現在のカーソルだけを返す。reset が true の場合は月全体を取得し直す
+// { month, reset, cursor, has_more, changes: [{ user_id, work_date, location }] }
+export async function fetchScheduleChanges(month, since) {
+    const res = await api.get('/schedules/changes', { params: { month, since } })
+    return res.data
+}
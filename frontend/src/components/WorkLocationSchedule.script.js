@@ -41,7 +41,20 @@ export async function loadData() {
     users.value = await fetchUsers()
     const yyyymm = `${year.value}-${String(month.value).padStart(2, '0')}`
     schedules.value = await fetchSchedules(yyyymm)
-    holidays.value = await fetchHolidays(year.value)
+    holidays.value = await loadHolidays(year.value)
+}
+
+// 祝日データがない年（404）は土日だけを休日として表示する
+async function loadHolidays(targetYear) {
+    try {
+        return await fetchHolidays(targetYear)
+    } catch (error) {
+        if (error.response?.status === 404) {
+            console.warn(`祝日データがありません（${targetYear}年）。土日のみを休日として表示します`)
+            return {}
+        }
+        throw error
+    }
 }
 
 export function getLocation(userId, day) {
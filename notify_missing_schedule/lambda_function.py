@@ -1,104 +1,160 @@
 import os
 import json
+import threading
+import time
 import requests
 import numpy as np
 import boto3
 import logging
 
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from typing import Optional
 
 API_BASE_URL = os.getenv("API_BASE_URL")
+SES_REGION = os.getenv("SES_REGION", "us-east-1")
+SES_MAX_SEND_RATE = float(os.getenv("SES_MAX_SEND_RATE", "14"))  # SES の1秒あたり最大送信数
+SES_CONCURRENCY = int(os.getenv("SES_CONCURRENCY", "8"))
+SES_MAX_RETRIES = int(os.getenv("SES_MAX_RETRIES", "3"))  # スロットリング時の再試行回数
+SES_RETRY_BACKOFF_SECONDS = float(os.getenv("SES_RETRY_BACKOFF_SECONDS", "1.0"))
+
+# 送信レート超過は待てば送れるため再試行する（日次の送信上限も Throttling で返るが、こちらは再試行しない）
+SES_THROTTLING_ERROR_CODES = {"Throttling", "ThrottlingException", "MaxSendingRateExceeded", "TooManyRequestsException"}
+
+LAMBDA_API_KEY_PARAMETER = '/hsano/notify_missing_schedule/lambda_api_key'
+PARAMETER_NAMES = [LAMBDA_API_KEY_PARAMETER]
+TOKEN_REFRESH_MARGIN_SECONDS = 300  # 有効期限のこの秒数前になったら再発行する
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def get_secret_parameter(name: str, with_decryption=True) -> str:
-    ssm = boto3.client('ssm')
-    try:
-        response = ssm.get_parameter(
-            Name=name,
-            WithDecryption=with_decryption
-        )
-        return response['Parameter']['Value']
-    except ClientError as e:
-        logger.error(f"Error getting parameter {name}: {e}")
-        raise e
+# ウォームスタート時に再利用するため、クライアントはモジュールスコープで作成する
+ssm = boto3.client('ssm')
+ses = boto3.client("ses", region_name=SES_REGION)
+
+# API 呼び出し用の HTTP セッション（keep-alive で接続を使い回す）
+http = requests.Session()
+http.verify = "selfsigned.pem"
+
+# 取得済みパラメータ・サービストークン（呼び出しをまたいでキャッシュする）
+_parameters = {}
+_service_token = {"token": None, "expires_at": 0.0}
+_holidays = {}
+
+def load_parameters() -> dict:
+    """必要なパラメータを1回の get_parameters でまとめて取得し、キャッシュする"""
+    if not _parameters:
+        try:
+            response = ssm.get_parameters(Names=PARAMETER_NAMES, WithDecryption=True)
+        except ClientError as e:
+            logger.error(f"Error getting parameters: {e}")
+            raise e
+        if response.get("InvalidParameters"):
+            raise Exception(f"Parameters not found: {response['InvalidParameters']}")
+        _parameters.update({p['Name']: p['Value'] for p in response['Parameters']})
+    return _parameters
+
+def get_secret_parameter(name: str) -> str:
+    return load_parameters()[name]
+
+def get_holidays(year: int) -> list:
+    """API の祝日カレンダーを取得する（年ごとに呼び出しをまたいでキャッシュする）
+
+    祝日データがない年（404）は土日だけで営業日を数える（キャッシュはしない）
+    """
+    if year not in _holidays:
+        response = http.get(f"{API_BASE_URL}/api/calendar/{year}")
+        if response.status_code == 404:
+            logger.warning(f"Holiday data is not available for {year}; counting weekdays only")
+            return []
+        response.raise_for_status()
+        _holidays[year] = list(response.json()["holidays"].keys())
+    return _holidays[year]
 
 def is_past_3_business_days(from_date: date) -> bool:
     today = date.today()
-    return np.busday_count(from_date.isoformat(), today.isoformat()) >= 3
-
-def lambda_login():
-    # LambdaログインAPI用認証キー取得
-    LAMBDA_API_KEY = get_secret_parameter('/hsano/notify_missing_schedule/lambda_api_key')
-
-    url = f"{API_BASE_URL}/api/auth/login/lambda"
-
-    response = requests.post(
-        url,
-        headers={"x-api-key": LAMBDA_API_KEY},
-        data={
-            "username": get_secret_parameter('/hsano/notify_missing_schedule/lambda_login_username'),
-            "password": get_secret_parameter('/hsano/notify_missing_schedule/lambda_login_password')
-        },
-        verify="selfsigned.pem"
-    )
+    holidays = get_holidays(from_date.year)
+    if today.year != from_date.year:
+        holidays = holidays + get_holidays(today.year)
+    return np.busday_count(from_date.isoformat(), today.isoformat(), holidays=holidays) >= 3
+
+def get_service_token() -> str:
+    """missing-schedule スコープのサービストークンを取得する（有効期限内はキャッシュを再利用）"""
+    if _service_token["token"] and time.time() < _service_token["expires_at"] - TOKEN_REFRESH_MARGIN_SECONDS:
+        return _service_token["token"]
+
+    url = f"{API_BASE_URL}/api/auth/service-token/lambda"
+    response = http.post(url, headers={"x-api-key": get_secret_parameter(LAMBDA_API_KEY_PARAMETER)})
     response.raise_for_status()
     data = response.json()
-    # 返却されたアクセストークンを取り出す
     access_token = data.get("access_token")
     if not access_token:
-        raise Exception("Failed to get access_token from login response")
+        raise Exception("Failed to get access_token from service token response")
+
+    _service_token["token"] = access_token
+    _service_token["expires_at"] = time.time() + data.get("expires_in", 0)
     return access_token
 
+def get_missing_schedule_emails(access_token: str, year: int, month: int) -> list:
+    """未登録ユーザのメールアドレスを NDJSON ストリーミングで全件取得する
+
+    送信より先に読み切る（送信中に API 側のカーソル・トランザクションを開いたままにしない）
+    終端の行（{"done": true, "count": N}）がない場合は途中で打ち切られたとみなしてエラーにする
+    """
+    url = f"{API_BASE_URL}/api/users/missing-schedule"
+    emails = []
+    with http.get(
+        url,
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"year": year, "month": month, "fields": "email", "format": "ndjson"},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("done"):
+                if record.get("count") != len(emails):
+                    raise Exception(f"Missing-schedule stream count mismatch: {len(emails)} != {record.get('count')}")
+                return [email for email in emails if email]
+            emails.append(record.get("email"))
+    raise Exception(f"Missing-schedule stream ended without a terminal record after {len(emails)} rows")
+
 def lambda_handler(event, context):
     today = date.today()
     first_day = date(today.year, today.month, 1)
 
-    if not is_past_3_business_days(first_day):
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "まだ3営業日経過していません"})
-        }
+    subject = "作業場所スケジュールが未登録です"
+    body = f"{today.month}月の作業場所スケジュールが登録されていません。至急ご対応ください。"
 
     try:
-        # 1. Lambda専用ログインしてトークン取得
-        access_token = lambda_login()
+        # 0. 祝日を考慮して月初から3営業日経過しているか確認
+        if not is_past_3_business_days(first_day):
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"message": "まだ3営業日経過していません"})
+            }
 
-        # 2. トークンを使って未登録ユーザ取得API呼び出し
-        url = f"{API_BASE_URL}/api/users/missing-schedule"
-        headers = {
-            "Authorization": f"Bearer {access_token}"
-        }
-        params = {
-            "year": today.year,
-            "month": today.month
-        }
+        # 1. サービストークン取得（ウォームスタート時はキャッシュを再利用）
+        access_token = get_service_token()
 
-        response = requests.get(
-            url,
-            headers=headers,
-            params=params,
-            verify="selfsigned.pem"
-        )
-        response.raise_for_status()
-        users = response.json()
-
-        # 3. 未登録ユーザへメール送信
-        sent_count = 0
-        for user in users:
-            email = user.get("email")
-            if email:
-                send_email(
-                    to=email,
-                    subject="作業場所スケジュールが未登録です",
-                    body=f"{today.month}月の作業場所スケジュールが登録されていません。至急ご対応ください。"
-                )
-                sent_count += 1
+        # 2. トークンを使って未登録ユーザのメールアドレスを全件取得する（途中で打ち切られた場合は送信しない）
+        emails = get_missing_schedule_emails(access_token, today.year, today.month)
+
+        # 3. メール送信
+        results = send_emails(emails, subject=subject, body=body)
+
+        sent_count = sum(1 for r in results if r["status"] == "sent")
+        failed = [r for r in results if r["status"] != "sent"]
 
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": f"{sent_count}人にメールを送信しました"})
+            "body": json.dumps({
+                "message": f"{sent_count}人にメールを送信しました",
+                "failed": failed
+            }, ensure_ascii=False)
         }
 
     except requests.HTTPError as e:
@@ -113,20 +169,62 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": f"予期しないエラー: {str(e)}"})
         }
 
-def send_email(to: str, subject: str, body: str):
-    ses = boto3.client("ses", region_name="us-east-1")
-    try:
-        response = ses.send_email(
-            Source=os.getenv("SES_FROM_EMAIL"),
-            Destination={"ToAddresses": [to]},
-            Message={
-                "Subject": {"Data": subject, "Charset": "UTF-8"},
-                "Body": {"Text": {"Data": body, "Charset": "UTF-8"}}
-            }
-        )
-        logger.info(f"Email sent to {to}: MessageId={response.get('MessageId')}")
-    except ClientError as e:
-        error_msg = e.response['Error']['Message']
-        logger.warning(f"Email to {to} failed: {error_msg}")
-    except Exception as e:
-        logger.error(f"Unexpected error sending email to {to}: {e}")
+class RateLimiter:
+    """1秒あたりの送信数を制限する（スレッドセーフ）"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+def _is_throttling(error: dict) -> bool:
+    return error.get("Code") in SES_THROTTLING_ERROR_CODES and "daily" not in error.get("Message", "").lower()
+
+def send_email(to: str, subject: str, body: str, limiter: Optional[RateLimiter] = None) -> dict:
+    """1件送信する。スロットリングされた場合は指数バックオフで再試行する"""
+    attempts = 0
+    while True:
+        attempts += 1
+        if limiter is not None:
+            limiter.wait()
+        try:
+            response = ses.send_email(
+                Source=os.getenv("SES_FROM_EMAIL"),
+                Destination={"ToAddresses": [to]},
+                Message={
+                    "Subject": {"Data": subject, "Charset": "UTF-8"},
+                    "Body": {"Text": {"Data": body, "Charset": "UTF-8"}}
+                }
+            )
+            logger.info(f"Email sent to {to}: MessageId={response.get('MessageId')}")
+            return {"to": to, "status": "sent", "message_id": response.get("MessageId"), "attempts": attempts}
+        except ClientError as e:
+            error = e.response['Error']
+            if _is_throttling(error) and attempts <= SES_MAX_RETRIES:
+                delay = SES_RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1))
+                logger.info(f"Email to {to} throttled ({error.get('Code')}), retrying in {delay}s")
+                time.sleep(delay)
+                continue
+            logger.warning(f"Email to {to} failed after {attempts} attempt(s): {error.get('Message')}")
+            return {"to": to, "status": "failed", "error": error.get("Message"), "attempts": attempts}
+        except Exception as e:
+            logger.error(f"Unexpected error sending email to {to}: {e}")
+            return {"to": to, "status": "failed", "error": str(e), "attempts": attempts}
+
+def send_emails(recipients: list, subject: str, body: str) -> list:
+    """SES の送信レートを超えないように、スレッドプールで並行送信する（宛先ごとの結果を返す）"""
+    limiter = RateLimiter(SES_MAX_SEND_RATE)
+
+    def send(to):
+        return send_email(to, subject, body, limiter)
+
+    with ThreadPoolExecutor(max_workers=SES_CONCURRENCY) as executor:
+        return list(executor.map(send, recipients))
@@ -0,0 +1,12 @@
+import os
+import sys
+
+from pathlib import Path
+
+# lambda_function はモジュールの読み込み時に boto3 のクライアントを作成するため、先に設定する
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("SES_FROM_EMAIL", "noreply@example.com")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,103 @@
+import boto3
+import pytest
+
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+import lambda_function
+
+@pytest.fixture
+def ses(monkeypatch):
+    with mock_aws():
+        client = boto3.client("ses", region_name=lambda_function.SES_REGION)
+        client.verify_email_identity(EmailAddress="noreply@example.com")
+        monkeypatch.setattr(lambda_function, "ses", client)
+        monkeypatch.setattr(lambda_function, "SES_RETRY_BACKOFF_SECONDS", 0)
+        yield client
+
+class FlakySES:
+    """最初の failures 回だけ指定したエラーを返し、その後は moto の SES に送る"""
+
+    def __init__(self, client, failures: int, code: str, message: str):
+        self.client = client
+        self.failures = failures
+        self.error = {"Error": {"Code": code, "Message": message}}
+        self.calls = 0
+
+    def send_email(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ClientError(self.error, "SendEmail")
+        return self.client.send_email(**kwargs)
+
+def sent_count(client) -> int:
+    return int(client.get_send_quota()["SentLast24Hours"])
+
+def test_send_emails_returns_result_per_recipient(ses):
+    recipients = [f"user{i}@example.com" for i in range(3)]
+
+    results = lambda_function.send_emails(recipients, subject="subject", body="body")
+
+    assert [r["to"] for r in results] == recipients
+    assert all(r["status"] == "sent" and r["message_id"] for r in results)
+    assert sent_count(ses) == 3
+
+def test_unverified_sender_fails_without_retry(ses, monkeypatch):
+    monkeypatch.setenv("SES_FROM_EMAIL", "unverified@example.com")
+
+    result = lambda_function.send_email("user@example.com", "subject", "body")
+
+    assert result["status"] == "failed"
+    assert result["attempts"] == 1
+    assert sent_count(ses) == 0
+
+@pytest.mark.parametrize("code", ["Throttling", "MaxSendingRateExceeded"])
+def test_throttling_is_retried_with_backoff(ses, monkeypatch, code):
+    flaky = FlakySES(ses, failures=2, code=code, message="Maximum sending rate exceeded.")
+    monkeypatch.setattr(lambda_function, "ses", flaky)
+
+    result = lambda_function.send_email("user@example.com", "subject", "body")
+
+    assert result["status"] == "sent"
+    assert result["attempts"] == 3
+    assert sent_count(ses) == 1
+
+def test_throttling_gives_up_after_max_retries(ses, monkeypatch):
+    flaky = FlakySES(ses, failures=10, code="Throttling", message="Maximum sending rate exceeded.")
+    monkeypatch.setattr(lambda_function, "ses", flaky)
+    monkeypatch.setattr(lambda_function, "SES_MAX_RETRIES", 2)
+
+    result = lambda_function.send_email("user@example.com", "subject", "body")
+
+    assert result["status"] == "failed"
+    assert result["attempts"] == 3
+    assert flaky.calls == 3
+
+def test_daily_quota_is_not_retried(ses, monkeypatch):
+    flaky = FlakySES(ses, failures=1, code="Throttling", message="Daily message quota exceeded.")
+    monkeypatch.setattr(lambda_function, "ses", flaky)
+
+    result = lambda_function.send_email("user@example.com", "subject", "body")
+
+    assert result["status"] == "failed"
+    assert result["attempts"] == 1
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload: dict = None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AssertionError("raise_for_status should not be reached")
+
+    def json(self):
+        return self.payload
+
+def test_missing_holiday_data_falls_back_to_weekdays(monkeypatch):
+    monkeypatch.setattr(lambda_function.http, "get", lambda url: FakeResponse(404))
+    monkeypatch.setattr(lambda_function, "_holidays", {})
+
+    assert lambda_function.get_holidays(2099) == []
+    # 次回の呼び出しで再取得できるよう、キャッシュしない
+    assert 2099 not in lambda_function._holidays